@@ -0,0 +1,92 @@
+"""
+HTTP query service for the medical QA and compliance pipelines (src/api.py).
+
+    python api_server.py --workers 4 --port 8000
+    curl -s localhost:8000/readyz
+    curl -s -X POST localhost:8000/search -d '{"query": "What is sleep apnea?", "top_k": 3}'
+    curl -N -X POST localhost:8000/answer -d '{"query": "What is sleep apnea?", "stream": true}'
+    curl -s -X POST localhost:8000/audit -d '{"max_workers": 4}'
+
+The parent process brings both vector stores up to date once (unless --skip-refresh), then
+starts N worker processes that all listen on the same port (SO_REUSEPORT, so the kernel
+spreads connections across them). Workers open the stores read-only and memory-mapped, so
+they share one copy of each index through the page cache, and each holds one embedding
+model. Put several hosts behind a load balancer that checks /readyz. With --shards the
+medical QA index is searched through shards built and served by shard_server.py.
+"""
+import sys
+import socket
+import argparse
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def run_worker(host: str, port: int, reuse_port: bool, rag_kwargs, checker_kwargs, batching=None):
+    from aiohttp import web
+    from src.api import create_app
+    app = create_app(rag_kwargs, checker_kwargs, batching=batching)
+    web.run_app(app, host=host, port=port, reuse_port=reuse_port, print=None, access_log=None)
+
+def prepare_stores(rag_kwargs, checker_kwargs):
+    """Build or refresh the stores once with writable instances, before any worker maps them."""
+    if rag_kwargs is not None and not rag_kwargs.get("shards"):
+        from src.search import RAGSearch
+        RAGSearch(**{**rag_kwargs, "read_only": False, "refresh_index": True})
+    if checker_kwargs is not None:
+        from src.compliance import ComplianceChecker
+        ComplianceChecker(**{**checker_kwargs, "read_only": False, "refresh_index": True})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve /search, /answer and /audit over HTTP")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--persist-dir", default="faiss_store")
+    parser.add_argument("--policy-persist-dir", default="faiss_store_policy")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--no-compliance", action="store_true", help="Serve only /search and /answer")
+    parser.add_argument("--skip-refresh", action="store_true", help="Serve the stores as they are on disk")
+    parser.add_argument("--batch-wait-ms", type=float, default=0.0,
+                        help="Coalesce concurrent queries for up to this long (0 disables batching)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Largest coalesced query batch")
+    parser.add_argument("--shards", nargs="+",
+                        help="Search these shards instead of --persist-dir: shard URLs, shard directories or a root of shard-N dirs")
+    args = parser.parse_args()
+
+    rag_kwargs = {"persist_dir": args.persist_dir, "data_dir": args.data_dir, "read_only": True, "refresh_index": False,
+                  "shards": args.shards}
+    checker_kwargs = None if args.no_compliance else {
+        "persist_dir": args.policy_persist_dir, "data_dir": args.data_dir, "read_only": True, "refresh_index": False}
+
+    batching = {"max_wait_ms": args.batch_wait_ms, "max_batch": args.batch_size} if args.batch_wait_ms > 0 else None
+
+    if not args.skip_refresh:
+        print("[INFO] Bringing vector stores up to date before starting workers...")
+        prepare_stores(rag_kwargs, checker_kwargs)
+
+    workers = max(1, args.workers)
+    if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        print("[WARNING] SO_REUSEPORT is not available on this platform; starting a single worker.")
+        workers = 1
+    if workers == 1:
+        run_worker(args.host, args.port, False, rag_kwargs, checker_kwargs, batching)
+        sys.exit(0)
+
+    # spawn, not fork: workers must not inherit the parent's model or FAISS state
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=run_worker, args=(args.host, args.port, True, rag_kwargs, checker_kwargs, batching),
+                             name=f"api-worker-{i}") for i in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"[INFO] Serving on http://{args.host}:{args.port} with {workers} workers "
+          f"(pids {', '.join(str(p.pid) for p in processes)})")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down workers...")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
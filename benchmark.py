@@ -0,0 +1,191 @@
+"""
+Offline retrieval benchmark for FaissVectorStore. For each corpus size and index
+configuration it measures build time, index size on disk and in RAM, load time (in-memory
+and memory-mapped), single-query and batched latency percentiles, throughput and recall@k
+against exact search, and writes everything to a JSON report tagged with the git commit.
+
+    python benchmark.py --sizes 10000 100000 1000000
+    python benchmark.py --store faiss_store --sizes 50000 --output bench.json
+    python benchmark.py --sizes 10000 --compare benchmark_results.json
+
+No model or network access is needed: corpora are synthetic clustered vectors, or vectors
+taken from an existing store and resampled with noise to the requested size.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import faiss
+import numpy as np
+from src.vectorstore import FaissVectorStore
+from src.model_registry import current_rss_mb
+from compression_report import load_store_vectors, synthetic_vectors
+
+DEFAULT_CONFIGS = [
+    ("flat", "flat", {}),
+    ("flat_int8", "flat", {"storage": "int8"}),
+    ("hnsw", "hnsw", {}),
+    ("ivf_flat", "ivf_flat", {}),
+    ("ivf_pq", "ivf_pq", {}),
+]
+
+def resample(base: np.ndarray, n: int, seed: int = 0) -> np.ndarray:
+    """n vectors drawn from base with small noise, so a small real store can stand in for a large one."""
+    if n <= len(base):
+        return base[:n].copy()
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), n)
+    noise = 0.05 * base.std() * rng.standard_normal((n, base.shape[1])).astype('float32')
+    return (base[picks] + noise).astype('float32')
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {f"p{p}": round(float(np.percentile(samples, p)), 3) for p in (50, 95, 99)}
+
+def dir_size_mb(path: str) -> float:
+    total = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    return round(total / 2 ** 20, 2)
+
+def bench_config(name, index_type, params, vectors, queries, truth, k, batch_size, work_dir):
+    persist_dir = os.path.join(work_dir, name)
+    store = FaissVectorStore(persist_dir, "benchmark", index_type=index_type, index_params=params,
+                             query_cache_path=None, chunk_cache_dir=None)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), 50000):
+        block = vectors[offset:offset + 50000]
+        store.add_embeddings(block, [{"text": f"chunk {offset + i}"} for i in range(len(block))])
+    store.save()
+    build_s = time.perf_counter() - start
+    ram_mb = len(faiss.serialize_index(store.index)) / 2 ** 20
+    del store
+    gc.collect()
+
+    result = {"config": name, "index_type": index_type, "params": params, "build_s": round(build_s, 2),
+              "disk_mb": dir_size_mb(persist_dir), "index_ram_mb": round(ram_mb, 2)}
+
+    for mode, read_only in (("load", False), ("mmap_load", True)):
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        store = FaissVectorStore(persist_dir, "benchmark", index_type=index_type, index_params=params,
+                                 query_cache_path=None, chunk_cache_dir=None, read_only=read_only)
+        store.load()
+        result[f"{mode}_s"] = round(time.perf_counter() - start, 3)
+        result[f"{mode}_rss_mb"] = round(current_rss_mb() - rss_before, 1)
+        if read_only:
+            del store
+            gc.collect()
+
+    store = FaissVectorStore(persist_dir, "benchmark", index_type=index_type, index_params=params,
+                             query_cache_path=None, chunk_cache_dir=None)
+    store.load()
+    single = []
+    for q in queries[:min(len(queries), 500)]:
+        start = time.perf_counter()
+        store.search_batch(q[None, :], top_k=k)
+        single.append((time.perf_counter() - start) * 1000)
+    result["single_ms"] = percentiles(single)
+
+    batched = []
+    found = []
+    start_all = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        start = time.perf_counter()
+        batch = store.search_batch(queries[offset:offset + batch_size], top_k=k)
+        batched.append((time.perf_counter() - start) * 1000)
+        found.extend([r["index"] for r in results] for results in batch)
+    result[f"batch{batch_size}_ms"] = percentiles(batched)
+    result["throughput_qps"] = round(len(queries) / (time.perf_counter() - start_all), 1)
+    result[f"recall@{k}"] = round(float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])), 4)
+    store.chunks.close()
+    shutil.rmtree(persist_dir, ignore_errors=True)
+    print(f"[INFO] {name}: {result}")
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def compare(current, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["corpus"], r["size"], r["config"]): r for r in baseline["results"]}
+    print(f"\nComparison with {baseline_path} (commit {baseline['meta']['commit']}):")
+    print("| corpus | size | config | metric | before | after | change |")
+    print("|---|---|---|---|---|---|---|")
+    for row in current["results"]:
+        before = old.get((row["corpus"], row["size"], row["config"]))
+        if before is None:
+            continue
+        for metric in ("build_s", "load_s", "throughput_qps"):
+            _print_change(row, before, metric, row[metric], before[metric])
+        for metric in ("single_ms", next(m for m in row if m.startswith("batch"))):
+            _print_change(row, before, f"{metric}.p95", row[metric]["p95"], before.get(metric, {}).get("p95"))
+        recall = next(m for m in row if m.startswith("recall@"))
+        _print_change(row, before, recall, row[recall], before.get(recall))
+
+def _print_change(row, before, metric, new, old):
+    if old in (None, 0):
+        return
+    print(f"| {row['corpus']} | {row['size']} | {row['config']} | {metric} | {old} | {new} | {(new - old) / old * 100:+.1f}% |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline FaissVectorStore benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--configs", nargs="+", help=f"Subset of {[c[0] for c in DEFAULT_CONFIGS]}")
+    parser.add_argument("--store", help="Derive the corpus from this vector store instead of synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Earlier report to print changes against")
+    args = parser.parse_args()
+
+    configs = [c for c in DEFAULT_CONFIGS if not args.configs or c[0] in args.configs]
+    corpus = f"store:{args.store}" if args.store else "synthetic"
+    base = load_store_vectors(args.store) if args.store else None
+    work_dir = tempfile.mkdtemp(prefix="rag_benchmark_")
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "faiss": faiss.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "k": args.k,
+            "batch_size": args.batch_size,
+        },
+        "results": [],
+    }
+    try:
+        for size in args.sizes:
+            vectors = resample(base, size) if base is not None else synthetic_vectors(size, args.dim)
+            rng = np.random.default_rng(1)
+            picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+            queries = vectors[picks] + 0.05 * vectors.std() * rng.standard_normal((len(picks), vectors.shape[1])).astype('float32')
+            exact = faiss.IndexFlatL2(vectors.shape[1])
+            exact.add(vectors)
+            _, truth = exact.search(queries, args.k)
+            del exact
+            print(f"[INFO] Benchmarking {corpus} corpus of {size} vectors (dim {vectors.shape[1]})")
+            for name, index_type, params in configs:
+                row = bench_config(name, index_type, params, vectors, queries, truth, args.k, args.batch_size, work_dir)
+                row.update({"corpus": corpus, "size": size, "dim": int(vectors.shape[1])})
+                report["results"].append(row)
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"[INFO] Wrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
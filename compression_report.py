@@ -0,0 +1,113 @@
+"""
+Recall-vs-memory report for the compact vector storage options (storage=float16/int8,
+pca_dim) in src/index_factory.py. Every configuration is built through create_index()
+like FaissVectorStore does, and recall@k is measured against exact float32 search.
+
+    python compression_report.py --store faiss_store
+    python compression_report.py --synthetic 100000 --dim 384 --json compression_report.json
+"""
+import time
+import json
+import argparse
+import faiss
+import numpy as np
+from src import index_factory
+
+def load_store_vectors(persist_dir: str) -> np.ndarray:
+    """
+    Every vector in a store's index, looked up by chunk id (ids are sparse once chunks have
+    been removed) and at the embedding dimension: a PCA transform is inverted on the way out.
+    """
+    index = faiss.read_index(f"{persist_dir}/faiss.index")
+    config = index_factory.load_config(persist_dir) or {}
+    if config.get("resolved", {}).get("pca_dim") or config.get("resolved", {}).get("storage", "float32") != "float32":
+        print("[WARNING] Store is already compressed; reconstructed vectors are approximate.")
+    ids = index_factory.stored_ids(index)
+    if len(ids) == 0:
+        return np.zeros((0, index.d), dtype='float32')
+    return index.reconstruct_batch(ids).astype('float32')
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Clustered like sentence embeddings rather than uniform noise, which PCA can't compress
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 500), dim)).astype('float32')
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def default_configs(dim: int, n: int):
+    nlist = max(1, int(np.sqrt(n)))
+    return [
+        ("flat float32", "flat", {}),
+        ("flat float16", "flat", {"storage": "float16"}),
+        ("flat int8", "flat", {"storage": "int8"}),
+        (f"flat PCA{dim // 2}", "flat", {"pca_dim": dim // 2}),
+        (f"flat PCA{dim // 2} float16", "flat", {"pca_dim": dim // 2, "storage": "float16"}),
+        (f"flat PCA{dim // 4} int8", "flat", {"pca_dim": dim // 4, "storage": "int8"}),
+        ("hnsw float32", "hnsw", {}),
+        ("hnsw float16", "hnsw", {"storage": "float16"}),
+        ("hnsw int8", "hnsw", {"storage": "int8"}),
+        ("ivf_flat int8", "ivf_flat", {"nlist": nlist, "storage": "int8"}),
+        ("ivf_pq", "ivf_pq", {"nlist": nlist}),
+    ]
+
+def run_report(vectors: np.ndarray, num_queries: int = 200, k: int = 10, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n, dim = vectors.shape
+    picks = rng.choice(n, min(num_queries, n), replace=False)
+    queries = vectors[picks] + 0.05 * vectors.std() * rng.standard_normal((len(picks), dim)).astype('float32')
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    ids = np.arange(n, dtype='int64')
+
+    rows = []
+    for name, index_type, params in default_configs(dim, n):
+        config = index_factory.resolve_config(index_type, params)
+        start = time.perf_counter()
+        index = index_factory.create_index(config, dim, min(n, index_factory.train_size(config) or n))
+        index_factory.train_index(index, vectors, config)
+        index.add_with_ids(vectors, ids)
+        build_seconds = time.perf_counter() - start
+        size = len(faiss.serialize_index(index))
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        rows.append({
+            "config": name,
+            "factory": config["factory"],
+            "bytes_per_vector": round(size / n, 1),
+            "index_mb": round(size / 2 ** 20, 2),
+            f"recall@{k}": round(float(recall), 4),
+            "build_s": round(build_seconds, 2),
+            "query_ms": round(latency_ms, 3),
+        })
+        print(f"[INFO] {name}: {rows[-1]}")
+    return rows
+
+def to_markdown(rows) -> str:
+    headers = list(rows[0].keys())
+    baseline = rows[0]["index_mb"] or 1
+    lines = ["| " + " | ".join(headers + ["vs float32"]) + " |", "|" + "---|" * (len(headers) + 1)]
+    for row in rows:
+        lines.append("| " + " | ".join(str(row[h]) for h in headers) + f" | {row['index_mb'] / baseline:.2f}x |")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs memory for compact FAISS storage options")
+    parser.add_argument("--store", help="Read vectors from this vector store directory")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Number of synthetic vectors when no store is given")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Also write the rows to this JSON file")
+    args = parser.parse_args()
+
+    vectors = load_store_vectors(args.store) if args.store else synthetic_vectors(args.synthetic, args.dim)
+    print(f"[INFO] Comparing storage options on {vectors.shape[0]} vectors of dimension {vectors.shape[1]}")
+    rows = run_report(vectors, num_queries=args.queries, k=args.k)
+    print(to_markdown(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[INFO] Wrote {args.json}")
@@ -0,0 +1,137 @@
+"""
+Embedding throughput per CPU inference backend (src/model_registry.py) and encode pool size
+(src/encode_pool.py), with an accuracy check against the reference torch model: every
+vector must stay within --tolerance cosine distance of the reference vector for the same
+text, otherwise the configuration is reported as FAIL and the script exits with status 1.
+
+    python embedding_benchmark.py --store faiss_store --limit 2000
+    python embedding_benchmark.py --synthetic 5000 --backends torch onnx int8 --processes 1 2 4 --output embedding.json
+
+The "baseline" row is a plain SentenceTransformer.encode() call with default settings in one
+process, as index builds ran before the encode pool. Model load and worker start-up are
+timed separately and not counted in chunks/sec.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import numpy as np
+from src.encode_pool import EncodePool
+from src.model_registry import EMBEDDING_BACKENDS, get_embedding_model
+
+WORDS = ("patient presents with chronic pain history of hypertension diabetes procedure performed under general "
+         "anesthesia the was tolerated well no complications noted discharge follow up in two weeks medication "
+         "dose daily allergy examination normal heart rate blood pressure policy employee must report incident").split()
+
+def store_texts(persist_dir: str, limit: int):
+    from src.chunk_store import ChunkStore
+    store = ChunkStore(os.path.join(persist_dir, "chunks.sqlite"), read_only=True)
+    ids = store.all_ids()[:limit]
+    chunks = store.get_many(ids)
+    return [chunks[i]["text"] for i in ids if i in chunks]
+
+def synthetic_texts(n: int, seed: int = 0):
+    # Lengths spread like real chunks (a few words up to ~1000 characters), so padding matters
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 180))) for _ in range(n)]
+
+def cosine_to_reference(vectors: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    a = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    b = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    return np.sum(a * b, axis=1)
+
+def time_encode(encode, texts, repeats: int):
+    best, vectors = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vectors = encode(texts)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, np.asarray(vectors, dtype='float32')
+
+def run_config(name: str, backend: str, processes: int, texts, reference, args) -> dict:
+    row = {"name": name, "backend": backend, "processes": processes}
+    start = time.perf_counter()
+    if name == "baseline":
+        model = get_embedding_model(args.model, backend)
+        encode, close = (lambda t: model.encode(t, show_progress_bar=False)), (lambda: None)
+    else:
+        pool = EncodePool(args.model, backend, processes=processes, batch_size=args.batch_size)
+        encode, close = pool.encode, pool.close
+    try:
+        if name != "baseline":
+            # Start the workers and load their models before timing
+            pool.encode(texts[:processes * args.batch_size])
+        row["startup_s"] = round(time.perf_counter() - start, 3)
+        seconds, vectors = time_encode(encode, texts, args.repeats)
+    finally:
+        close()
+    row["seconds"] = round(seconds, 3)
+    row["chunks_per_sec"] = round(len(texts) / seconds, 1)
+    if reference is not None:
+        cosine = cosine_to_reference(vectors, reference)
+        row["min_cosine"] = round(float(cosine.min()), 5)
+        row["mean_cosine"] = round(float(cosine.mean()), 5)
+        row["ok"] = bool(1.0 - cosine.min() <= args.tolerance)
+    return row, vectors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding throughput per backend with a cosine tolerance check")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--store", default="faiss_store", help="Encode chunk texts from this vector store")
+    source.add_argument("--synthetic", type=int, help="Encode this many generated texts instead")
+    parser.add_argument("--limit", type=int, default=2000, help="Most chunks to take from --store")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, max(1, (os.cpu_count() or 2) // 2)])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=1, help="Timed runs per configuration (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Largest allowed cosine distance to the torch vectors")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.synthetic) if args.synthetic else store_texts(args.store, args.limit)
+    if not texts:
+        sys.exit("[ERROR] No texts to encode; build the store first or pass --synthetic N.")
+    lengths = [len(t) for t in texts]
+    print(f"[INFO] {len(texts)} texts, {np.mean(lengths):.0f} characters on average (max {max(lengths)}), "
+          f"{os.cpu_count()} CPUs")
+
+    # The reference vectors come from the current behaviour: torch, default encode() settings
+    baseline, reference = run_config("baseline", "torch", 1, texts, None, args)
+    baseline.update({"min_cosine": 1.0, "mean_cosine": 1.0, "ok": True})
+    rows = [baseline]
+    for backend in args.backends:
+        for processes in sorted(set(args.processes)):
+            name = f"{backend} x{processes}"
+            try:
+                row, _ = run_config(name, backend, processes, texts, reference, args)
+            except Exception as e:
+                print(f"[WARNING] Skipping {name}: {type(e).__name__}: {e}")
+                rows.append({"name": name, "backend": backend, "processes": processes, "error": str(e)})
+                continue
+            rows.append(row)
+
+    print(f"\n{'configuration':<16} {'chunks/sec':>11} {'speedup':>8} {'startup':>9} {'min cos':>9} {'mean cos':>9}  check")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['name']:<16} {'-':>11} {'-':>8} {'-':>9} {'-':>9} {'-':>9}  ERROR")
+            continue
+        print(f"{row['name']:<16} {row['chunks_per_sec']:>11.1f} {row['chunks_per_sec'] / baseline['chunks_per_sec']:>7.2f}x "
+              f"{row['startup_s']:>8.2f}s {row['min_cosine']:>9.5f} {row['mean_cosine']:>9.5f}  "
+              f"{'ok' if row['ok'] else 'FAIL'}")
+
+    failed = [row["name"] for row in rows if row.get("ok") is False]
+    if failed:
+        print(f"[WARNING] Outside the cosine tolerance of {args.tolerance}: {', '.join(failed)}")
+
+    if args.output:
+        report = {"texts": len(texts), "model": args.model, "tolerance": args.tolerance, "cpu_count": os.cpu_count(),
+                  "python": platform.python_version(), "results": rows}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Wrote {args.output}")
+    sys.exit(1 if failed else 0)
@@ -1,6 +1,31 @@
 import pandas as pd
 import os
 
+def stage_breakdown(df: pd.DataFrame) -> str:
+    """Markdown table of the per-stage columns written by evaluate.py (empty for older CSVs)."""
+    stage_cols = [c for c in df.columns if c.startswith("stage_")]
+    if not stage_cols:
+        return ""
+    total = df['time_taken'].sum() or 1
+    rows = []
+    for col in sorted(stage_cols, key=lambda c: -df[c].fillna(0).sum()):
+        values = df[col].fillna(0)
+        rows.append(f"| {col[len('stage_'):]} | {values.mean() * 1000:.1f} | {values.quantile(0.95) * 1000:.1f} | "
+                    f"{values.sum() / total * 100:.1f}% |")
+    section = """
+### 4. Latency Breakdown by Stage
+
+| Stage | Mean (ms) | p95 (ms) | Share of Total |
+|:---|---:|---:|---:|
+""" + "\n".join(rows) + "\n"
+    token_cols = [c for c in df.columns if c.startswith("tokens_")]
+    if token_cols:
+        section += "\n| Tokens per Query | Mean |\n|:---|---:|\n" + "\n".join(
+            f"| {c[len('tokens_'):]} | {df[c].fillna(0).mean():.0f} |" for c in token_cols) + "\n"
+    if "answer_cache_hit" in df.columns:
+        section += f"\n**Answer cache hit rate:** {df['answer_cache_hit'].fillna(False).astype(bool).mean() * 100:.1f}%\n"
+    return section
+
 def generate_markdown_report():
     report_path = "Evaluation_Report.md"
     
@@ -50,6 +75,10 @@ The system was tested with {total_queries} diverse medical questions covering sy
 - **2s - 5s**: {len(df[(df['time_taken'] >= 2) & (df['time_taken'] < 5)])} queries
 - **> 5s**: {len(df[df['time_taken'] >= 5])} queries
 """
+        breakdown = stage_breakdown(df)
+        if breakdown:
+            print(breakdown)
+            task1_section += breakdown
     else:
         task1_section = "\n## 🏥 Task 1: Medical RAG QA System Evaluation\n\n*No evaluation data found. Please run `evaluate.py` first.*"
 
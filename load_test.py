@@ -0,0 +1,160 @@
+"""
+Concurrent load tester for query retrieval. Reports throughput, p50/p95/p99 latency and
+errors for a number of simultaneous users, either against the HTTP service or in-process
+against a vector store, where it compares unbatched queries with the QueryBatcher
+(src/batching.py) at the given max wait and batch size.
+
+    python load_test.py --url http://localhost:8000/search --users 64 --duration 30
+    python load_test.py --store faiss_store --users 32 --requests 2000 --batch-wait-ms 2 5 10
+
+Queries are made unique by default (--repeat to allow repeats), so each one misses the
+query embedding cache and has to be encoded, as with real user traffic.
+"""
+import io
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import contextlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_QUERIES = [
+    "What are the symptoms of allergic rhinitis?",
+    "Describe the procedure for laparoscopic gastric bypass.",
+    "What is a 2-D Echocardiogram used for?",
+    "Treatment for chronic back pain?",
+    "What is sleep apnea?",
+    "Signs of a heart attack?",
+    "Management of type 2 diabetes?",
+    "Symptoms of kidney stones?",
+    "Treatment for migraine headaches?",
+    "What is a lumbar puncture?",
+]
+
+def make_queries(n: int, unique: bool, seed: int = 0):
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        query = rng.choice(BASE_QUERIES)
+        queries.append(f"{query} (case {i})" if unique else query)
+    return queries
+
+def summarize(latencies_ms, errors: int, seconds: float) -> dict:
+    samples = np.asarray(latencies_ms) if latencies_ms else np.zeros(1)
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "seconds": round(seconds, 2),
+        "throughput_qps": round(len(latencies_ms) / seconds, 1) if seconds else 0.0,
+        **{f"p{p}_ms": round(float(np.percentile(samples, p)), 2) for p in (50, 95, 99)},
+        "max_ms": round(float(samples.max()), 2),
+    }
+
+def print_row(name: str, row: dict):
+    print(f"  {name:<28} {row['throughput_qps']:>9.1f} q/s  p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  "
+          f"p99 {row['p99_ms']:>8.2f} ms  errors {row['errors']}"
+          + (f"  mean batch {row['mean_batch_size']:.1f}" if "mean_batch_size" in row else ""))
+
+async def run_http(url: str, users: int, queries, duration: float, top_k: int) -> dict:
+    import aiohttp
+    latencies = []
+    errors = 0
+    next_query = iter(queries)
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def user(session):
+        nonlocal errors
+        while deadline is None or time.perf_counter() < deadline:
+            query = next(next_query, None)
+            if query is None:
+                return
+            start = time.perf_counter()
+            try:
+                async with session.post(url, json={"query": query, "top_k": top_k}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=users)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(session) for _ in range(users)))
+        return summarize(latencies, errors, time.perf_counter() - start)
+
+def run_inprocess(store, users: int, queries, top_k: int) -> dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(query):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            store.query(query, top_k=top_k)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    # query() logs every call; keep that out of the timings and the report
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(one, queries))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent retrieval load test")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="POST endpoint of the HTTP service, e.g. http://localhost:8000/search")
+    target.add_argument("--store", help="Vector store directory to query in-process (unbatched vs batched)")
+    parser.add_argument("--users", type=int, default=32, help="Concurrent users")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests (per configuration)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop HTTP runs after this many seconds (0: run all requests)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-wait-ms", type=float, nargs="+", default=[5.0], help="In-process: max waits to compare")
+    parser.add_argument("--batch-size", type=int, default=32, help="In-process: largest coalesced batch")
+    parser.add_argument("--repeat", action="store_true", help="Allow repeated queries (served from the query cache)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        print(f"[INFO] {args.users} users -> {args.url}")
+        results["http"] = asyncio.run(run_http(args.url, args.users, make_queries(args.requests, not args.repeat),
+                                               args.duration, args.top_k))
+        print_row("http", results["http"])
+    else:
+        import os
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        from src.vectorstore import FaissVectorStore
+        store = FaissVectorStore(args.store, read_only=True, query_cache_path=None)
+        store.load()
+        store.model  # load the embedding model before timing anything
+        print(f"[INFO] {args.users} concurrent users, {args.requests} queries per configuration")
+        configs = [("unbatched", None)] + [(f"batched wait={w}ms max={args.batch_size}", w) for w in args.batch_wait_ms]
+        for seed, (name, wait) in enumerate(configs):
+            if wait is None:
+                store.disable_batching()
+            else:
+                store.enable_batching(max_wait_ms=wait, max_batch=args.batch_size)
+            row = run_inprocess(store, args.users, make_queries(args.requests, not args.repeat, seed), args.top_k)
+            if store.batcher is not None:
+                row.update(store.batcher.stats())
+            results[name] = row
+            print_row(name, row)
+        store.disable_batching()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Wrote {args.output}")
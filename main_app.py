@@ -68,22 +68,11 @@ if task == "🏠 Home":
     st.info("👆 Please select a task from the sidebar to begin.")
 
 elif task == "🏥 Medical QA":
-    # We can run the other script or import its main function. 
-    # Importing is better but streamlit scripts are weird. 
-    # Let's just use os.system or similar if we want to keep them separate, 
-    # OR better, refactor them into functions.
-    # For simplicity in this environment, I'll just point the user to run the specific files 
-    # or I can try to inline the code.
-    
-    # Let's try to execute the file content.
-    with open("streamlit_app.py", "r", encoding='utf-8') as f:
-        code = f.read()
-        # Remove set_page_config from the code as it can only be called once
-        code = code.replace("st.set_page_config", "# st.set_page_config")
-        exec(code, {"__name__": "__main__"})
+    # Page modules are imported once per process (not re-read and exec'd on every rerun);
+    # their heavy pipeline imports happen inside the cached resource getters
+    import streamlit_app
+    streamlit_app.render()
 
 elif task == "🛡️ Compliance Checker":
-    with open("task2_app.py", "r", encoding='utf-8') as f:
-        code = f.read()
-        code = code.replace("st.set_page_config", "# st.set_page_config")
-        exec(code, {"__name__": "__main__"})
+    import task2_app
+    task2_app.render()
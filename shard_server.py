@@ -0,0 +1,82 @@
+"""
+Build and serve shards of the medical QA index (src/sharding.py). Chunks are assigned to
+shards by a hash of their text, so every shard can be built on its own machine from the
+same data directory, and each one holds its own FAISS index and chunk store.
+
+    python shard_server.py build --root faiss_shards --num-shards 4                 # all shards, in parallel
+    python shard_server.py build --root faiss_shards --num-shards 4 --shard 2       # just one
+    python shard_server.py serve --store faiss_shards/shard-2 --port 9002           # serve it over HTTP
+    python shard_server.py query --shards faiss_shards "What is sleep apnea?"       # scatter-gather check
+
+A coordinator searches them with ShardedVectorStore, RAGSearch(shards=[...]) or
+`api_server.py --shards faiss_shards` (local shard processes) / `--shards http://host:9002 ...`.
+"""
+import sys
+import argparse
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def build(root: str, shard: int, num_shards: int, data_dir: str, index_type: str, encode_processes: int):
+    from src.sharding import build_shard
+    stats = build_shard(root, shard, num_shards, data_dir, index_type=index_type, encode_processes=encode_processes)
+    print(f"[INFO] Shard {shard}/{num_shards}: {stats}")
+
+def serve(store: str, host: str, port: int):
+    from aiohttp import web
+    from src.api import create_shard_app
+    web.run_app(create_shard_app(store), host=host, port=port, print=None, access_log=None)
+
+def query(shards, text: str, top_k: int):
+    from src.sharding import ShardedVectorStore
+    store = ShardedVectorStore(shards, query_cache_path=None)
+    try:
+        store.load()
+        for hit in store.query(text, top_k=top_k):
+            meta = hit["metadata"] or {}
+            print(f"  id {int(hit['index']):>8}  distance {float(hit['distance']):.4f}  "
+                  f"{meta.get('source', '?')}: {meta.get('text', '')[:80]!r}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, serve and query index shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    b = commands.add_parser("build", help="Build or refresh shards from --data-dir")
+    b.add_argument("--root", default="faiss_shards")
+    b.add_argument("--num-shards", type=int, required=True)
+    b.add_argument("--shard", type=int, nargs="+", help="Shards to build (default: all, one process each)")
+    b.add_argument("--data-dir", default="data")
+    b.add_argument("--index-type", default="flat")
+    b.add_argument("--encode-processes", type=int, default=1, help="Encode workers per shard build")
+    s = commands.add_parser("serve", help="Serve one shard over HTTP")
+    s.add_argument("--store", required=True, help="Shard directory, e.g. faiss_shards/shard-0")
+    s.add_argument("--host", default="0.0.0.0")
+    s.add_argument("--port", type=int, default=9000)
+    q = commands.add_parser("query", help="Scatter-gather one query across shards")
+    q.add_argument("--shards", nargs="+", required=True, help="Shard URLs, shard directories or a root of shard-N dirs")
+    q.add_argument("--top-k", type=int, default=5)
+    q.add_argument("text")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.store, args.host, args.port)
+    elif args.command == "query":
+        query(args.shards, args.text, args.top_k)
+    else:
+        selected = args.shard if args.shard is not None else list(range(args.num_shards))
+        if any(not 0 <= i < args.num_shards for i in selected):
+            sys.exit(f"[ERROR] --shard must be in 0..{args.num_shards - 1}")
+        ctx = multiprocessing.get_context("spawn")
+        processes = [ctx.Process(target=build, name=f"build-shard-{i}",
+                                 args=(args.root, i, args.num_shards, args.data_dir, args.index_type, args.encode_processes))
+                     for i in selected]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [i for i, process in zip(selected, processes) if process.exitcode != 0]
+        if failed:
+            sys.exit(f"[ERROR] Building shards {failed} failed")
+        print(f"[INFO] Built shards {selected} of {args.num_shards} under {args.root}")
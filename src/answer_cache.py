@@ -0,0 +1,111 @@
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from src.embedding_cache import normalize_query
+
+class AnswerCache:
+    """
+    In-memory cache of LLM answers. An answer is reused only when the question, the ids of
+    the retrieved chunks (in order), the prompt template and the model name all match, so a
+    changed retrieval or prompt never serves a stale answer. Entries expire after ttl_seconds,
+    the least recently used entry is evicted past max_entries, and the whole cache is dropped
+    when the vector store's index_version changes.
+
+    With semantic_threshold set, a question that misses exactly can still hit an entry built
+    from the same retrieved context if the cosine similarity of their query embeddings is at
+    least the threshold (near-duplicate phrasings of the same question).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, semantic_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._index_version = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _context_key(chunk_ids: List[int], prompt_template: str, model_name: str) -> str:
+        payload = json.dumps([list(map(int, chunk_ids)), prompt_template, model_name])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _check_version(self, index_version: Optional[str]):
+        if index_version != self._index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._index_version = index_version
+
+    def _live(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, query: str, chunk_ids: List[int], prompt_template: str, model_name: str,
+            index_version: Optional[str] = None, embed: Optional[Callable[[str], np.ndarray]] = None) -> Optional[str]:
+        context_key = self._context_key(chunk_ids, prompt_template, model_name)
+        key = f"{context_key}:{normalize_query(query)}"
+        with self._lock:
+            self._check_version(index_version)
+            entry = self._live(key)
+            if entry is not None:
+                self.hits += 1
+                return entry["answer"]
+            candidates = [k for k, e in self._entries.items() if e["context_key"] == context_key and e["embedding"] is not None]
+        if self.semantic_threshold is not None and embed is not None and candidates:
+            vector = self._unit(embed(query))
+            with self._lock:
+                for k in candidates:
+                    entry = self._live(k)
+                    if entry is not None and float(np.dot(vector, entry["embedding"])) >= self.semantic_threshold:
+                        self.semantic_hits += 1
+                        return entry["answer"]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, chunk_ids: List[int], prompt_template: str, model_name: str, answer: str,
+            index_version: Optional[str] = None, embed: Optional[Callable[[str], np.ndarray]] = None):
+        context_key = self._context_key(chunk_ids, prompt_template, model_name)
+        embedding = None
+        if self.semantic_threshold is not None and embed is not None:
+            embedding = self._unit(embed(query))
+        with self._lock:
+            self._check_version(index_version)
+            key = f"{context_key}:{normalize_query(query)}"
+            self._entries[key] = {"answer": answer, "created": time.time(), "context_key": context_key, "embedding": embedding}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype='float32').ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
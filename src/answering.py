@@ -0,0 +1,120 @@
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from src import metrics
+from src.context import pack_context, format_stats, count_tokens
+from src.results import AnswerResult, RetrievedChunk
+
+class AnswerMixin:
+    """
+    Question answering shared by RAGSearch and ComplianceChecker (Policy Q&A): retrieval into
+    an AnswerResult, context packing, the answer cache and the LLM call, streamed or not.
+    The class provides vectorstore, llm, model_name, answer_cache and context_token_budget.
+    """
+    prompt_template = "{context}\n\n{query}"
+    # result.answer when no retrieved text makes it into the context
+    no_context_answer: Optional[str] = None
+    # True: an LLM error becomes the answer text; False: it is raised to the caller
+    llm_errors_as_answer = False
+    last_context_stats = None
+    # Per-stage timings, token counts and cache results of the last request (see src/metrics.py)
+    last_trace = None
+
+    def _answer(self, query: str, top_k: int, filter: Optional[Dict[str, Any]], stream: bool,
+                timings: Optional[Dict[str, float]], pipeline: str) -> AnswerResult:
+        """
+        Answer query from one embedding and one search, traced as pipeline. With stream=True
+        the LLM call starts when result.stream() is iterated; the result's timings and trace
+        are complete once it is exhausted, whether the LLM succeeds or fails.
+        """
+        result = AnswerResult(query=query, timings=timings if timings is not None else {})
+        trace = self.last_trace = result.trace = metrics.Trace(pipeline)
+        with metrics.activate(trace):
+            with trace.stage("retrieval"):
+                results = self.vectorstore.query(query, top_k=top_k, filter=filter)
+            result.timings["retrieval"] = result.elapsed()
+            result.chunks = [RetrievedChunk.from_search_result(r) for r in results if r["metadata"]]
+            prompt, cache_args = self._prepare(query, results, result, trace)
+        if prompt is None:
+            result.finish()
+        elif stream:
+            result.tokens = self._stream_tokens(prompt, cache_args, result)
+        else:
+            try:
+                with metrics.activate(trace):
+                    result.answer = self._generate(prompt, cache_args, trace)
+            finally:
+                result.finish()
+        return result
+
+    def _pack_context(self, results: List[Dict[str, Any]]):
+        with metrics.stage("context_packing"):
+            context, chunk_ids, stats = pack_context(results, token_budget=self.context_token_budget)
+        metrics.record_context(stats)
+        self.last_context_stats = stats
+        if context:
+            print(f"[INFO] Context packing: {format_stats(stats)}")
+        return context, chunk_ids, stats
+
+    def _prepare(self, query: str, results: List[Dict[str, Any]], result: AnswerResult, trace: metrics.Trace):
+        """
+        Pack the context and check the answer cache. Returns (prompt, cache_args) for the LLM
+        call, or (None, None) when result.answer is already settled (no context or cached).
+        """
+        # Stats come back with the context: last_context_stats may belong to another thread's request
+        context, chunk_ids, result.context_stats = self._pack_context(results)
+        result.context_ids = chunk_ids
+        if not context:
+            result.answer = self.no_context_answer
+            return None, None
+
+        cache_args = (query, chunk_ids, self.prompt_template, self.model_name)
+        with trace.stage("answer_cache"):
+            cached = self.answer_cache.get(*cache_args, index_version=self.vectorstore.index_version, embed=self._embed_query)
+        trace.cache_result("answer", cached is not None)
+        if cached is not None:
+            result.answer = cached
+            result.cached = True
+            return None, None
+
+        prompt = self.prompt_template.format(context=context, query=query)
+        trace.add_tokens("prompt", count_tokens(prompt))
+        return prompt, cache_args
+
+    def _generate(self, prompt: str, cache_args, trace: metrics.Trace) -> str:
+        try:
+            with trace.stage("llm_generate"):
+                answer = self.llm.generate(prompt)
+        except Exception as e:
+            if not self.llm_errors_as_answer:
+                raise
+            return f"Error generating response: {e}"
+        trace.add_tokens("completion", count_tokens(answer))
+        self.answer_cache.put(*cache_args, answer, index_version=self.vectorstore.index_version, embed=self._embed_query)
+        return answer
+
+    def _stream_tokens(self, prompt: str, cache_args, result: AnswerResult) -> Iterator[str]:
+        trace = result.trace
+        parts = []
+        llm_start = time.perf_counter()
+        try:
+            for token in self.llm.stream(prompt):
+                if not parts:
+                    result.timings["time_to_first_token"] = result.elapsed()
+                    trace.record("llm_first_token", time.perf_counter() - llm_start)
+                parts.append(token)
+                yield token
+        except Exception as e:
+            result.finish()
+            if not self.llm_errors_as_answer:
+                raise
+            yield f"Error generating response: {e}"
+            return
+        # Includes the time the consumer spent between tokens, as the user experiences it
+        trace.record("llm_stream", time.perf_counter() - llm_start)
+        trace.add_tokens("completion", count_tokens("".join(parts)))
+        result.finish()
+        self.answer_cache.put(*cache_args, "".join(parts), index_version=self.vectorstore.index_version, embed=self._embed_query)
+
+    def _embed_query(self, query: str):
+        # Served from the query embedding cache, since retrieval just embedded the same text
+        return self.vectorstore.embed_queries([query])[0]
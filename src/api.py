@@ -0,0 +1,274 @@
+import os
+import json
+import asyncio
+import numpy as np
+from typing import Any, Dict, Optional
+from aiohttp import web
+from src import metrics
+from src.results import AnswerResult, RetrievedChunk
+from src.sharding import describe_shard, hits_json
+
+# Loading state and the pipelines themselves, filled in after the worker starts
+STATE_KEY = web.AppKey("state", dict)
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 50
+# Upper bounds for the integer run_audit() options accepted by POST /audit
+AUDIT_INT_LIMITS = {"max_workers": 32, "max_retries": 10}
+
+def _chunk_json(chunk: RetrievedChunk) -> Dict[str, Any]:
+    return {"id": chunk.id, "distance": chunk.distance, "score": chunk.score, "text": chunk.text, "metadata": chunk.metadata}
+
+def _result_json(result: AnswerResult) -> Dict[str, Any]:
+    return {
+        "query": result.query,
+        "answer": result.answer,
+        "cached": result.cached,
+        "chunks": [_chunk_json(c) for c in result.chunks],
+        "context_ids": result.context_ids,
+        "context_stats": result.context_stats,
+        "timings": result.timings,
+    }
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+def _is_int(value: Any) -> bool:
+    # JSON true/false arrive as bool, which is a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+async def _read_query(request: web.Request) -> Dict[str, Any]:
+    """Parse {"query", "top_k", "filter"}; raises HTTPBadRequest with a JSON body on bad input."""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise _bad_request("Body must be JSON")
+    query = body.get("query") if isinstance(body, dict) else None
+    if not isinstance(query, str) or not query.strip():
+        raise _bad_request("'query' must be a non-empty string")
+    top_k = body.get("top_k", DEFAULT_TOP_K)
+    if not _is_int(top_k) or not 1 <= top_k <= MAX_TOP_K:
+        raise _bad_request(f"'top_k' must be an integer in 1..{MAX_TOP_K}")
+    filter = body.get("filter")
+    if filter is not None and not isinstance(filter, dict):
+        raise _bad_request("'filter' must be an object")
+    return {"query": query, "top_k": top_k, "filter": filter or None, "stream": bool(body.get("stream", False))}
+
+async def _read_audit_options(request: web.Request) -> Dict[str, Any]:
+    """Parse the optional run_audit() settings; raises HTTPBadRequest with a JSON body on bad input."""
+    try:
+        body = await request.json() if request.can_read_body else {}
+    except json.JSONDecodeError:
+        raise _bad_request("Body must be JSON")
+    if not isinstance(body, dict):
+        raise _bad_request("Body must be a JSON object")
+    options = {}
+    for key, limit in AUDIT_INT_LIMITS.items():
+        if key in body:
+            low = 1 if key == "max_workers" else 0
+            if not _is_int(body[key]) or not low <= body[key] <= limit:
+                raise _bad_request(f"'{key}' must be an integer in {low}..{limit}")
+            options[key] = body[key]
+    for key in ("requests_per_second", "timeout"):
+        if key in body:
+            value = body[key]
+            # null means no rate limit / no deadline
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not 0 < value < float("inf")):
+                raise _bad_request(f"'{key}' must be a positive number or null")
+            options[key] = value
+    return options
+
+def _pipeline(request: web.Request, name: str):
+    state = request.app[STATE_KEY]
+    if name not in state["services"]:
+        raise web.HTTPNotFound(text=json.dumps({"error": f"'{name}' is not enabled on this server"}),
+                               content_type="application/json")
+    pipeline = state.get(name)
+    if pipeline is None:
+        raise web.HTTPServiceUnavailable(text=json.dumps({"error": state.get("error") or "Service is still loading"}),
+                                         content_type="application/json")
+    return pipeline
+
+async def healthz(request: web.Request) -> web.Response:
+    """Liveness: the worker's event loop is responding."""
+    return web.json_response({"status": "ok", "pid": os.getpid()})
+
+async def readyz(request: web.Request) -> web.Response:
+    """Readiness: the index (and compliance checker, if enabled) is loaded and can serve queries."""
+    state = request.app[STATE_KEY]
+    body = {"ready": state["ready"], "pid": os.getpid(), "services": state["services"], "load_seconds": state["load_seconds"]}
+    if state.get("error"):
+        body["error"] = state["error"]
+    return web.json_response(body, status=200 if state["ready"] else 503)
+
+async def search(request: web.Request) -> web.Response:
+    params = await _read_query(request)
+    rag = _pipeline(request, "rag")
+
+    def run():
+        with metrics.start_trace("api_search") as trace:
+            results = rag.vectorstore.query(params["query"], top_k=params["top_k"], filter=params["filter"])
+        return results, trace
+
+    results, trace = await asyncio.to_thread(run)
+    chunks = [RetrievedChunk.from_search_result(r) for r in results if r["metadata"]]
+    return web.json_response({"query": params["query"], "chunks": [_chunk_json(c) for c in chunks],
+                              "timings": {"total": trace.total, **trace.stages}})
+
+async def answer(request: web.Request) -> web.StreamResponse:
+    """
+    Answer with RAGSearch.answer(). With "stream": true the reply is a server-sent event
+    stream: one "token" event per LLM chunk, then a "done" event with the chunks, context
+    stats and timings (or an "error" event).
+    """
+    params = await _read_query(request)
+    rag = _pipeline(request, "rag")
+    if not params["stream"]:
+        result = await asyncio.to_thread(rag.answer, params["query"], params["top_k"], params["filter"])
+        return web.json_response(_result_json(result))
+
+    result = await asyncio.to_thread(rag.answer, params["query"], params["top_k"], params["filter"], True)
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    tokens = result.stream()
+    done = object()
+    try:
+        while True:
+            # The LLM client is synchronous; pull each token on a worker thread
+            token = await asyncio.to_thread(next, tokens, done)
+            if token is done:
+                break
+            await response.write(f"event: token\ndata: {json.dumps(token)}\n\n".encode("utf-8"))
+        payload = _result_json(result)
+        await response.write(f"event: done\ndata: {json.dumps(payload, default=str)}\n\n".encode("utf-8"))
+    except ConnectionResetError:
+        # Client went away; stop pulling tokens
+        return response
+    except Exception as e:
+        await response.write(f"event: error\ndata: {json.dumps(str(e))}\n\n".encode("utf-8"))
+    await response.write_eof()
+    return response
+
+async def audit(request: web.Request) -> web.Response:
+    """Run the compliance audit; body may set max_workers, requests_per_second, max_retries and timeout."""
+    options = await _read_audit_options(request)
+    checker = _pipeline(request, "checker")
+    df = await asyncio.to_thread(checker.run_audit, **options)
+    return web.json_response({"results": df.to_dict(orient="records")})
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    # Per worker: a scraper behind the load balancer sees whichever worker answered
+    return web.Response(text=metrics.REGISTRY.to_prometheus(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Worker-Pid": str(os.getpid())})
+
+async def _load_pipelines(app: web.Application, rag_kwargs: Optional[Dict[str, Any]], checker_kwargs: Optional[Dict[str, Any]],
+                          batching: Optional[Dict[str, Any]]):
+    state = app[STATE_KEY]
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        if rag_kwargs is not None:
+            from src.search import RAGSearch
+            rag = await asyncio.to_thread(RAGSearch, **rag_kwargs)
+            if batching:
+                # Requests run on the worker's thread pool, so concurrent queries can be coalesced
+                rag.vectorstore.enable_batching(**batching)
+            state["rag"] = rag
+        if checker_kwargs is not None:
+            from src.compliance import ComplianceChecker
+            state["checker"] = await asyncio.to_thread(ComplianceChecker, **checker_kwargs)
+        state["ready"] = True
+        state["load_seconds"] = round(loop.time() - start, 3)
+        print(f"[INFO] Worker {os.getpid()} ready in {state['load_seconds']:.2f}s")
+    except Exception as e:
+        state["error"] = f"{type(e).__name__}: {e}"
+        print(f"[ERROR] Worker {os.getpid()} failed to load pipelines: {state['error']}")
+
+async def shard_search(request: web.Request) -> web.Response:
+    """Search this shard with query vectors embedded by the coordinator (src/sharding.py)."""
+    store = _pipeline(request, "shard")
+    try:
+        body = await request.json()
+        vectors = np.asarray(body["vectors"], dtype='float32')
+        top_k = int(body.get("top_k", DEFAULT_TOP_K))
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return _error(400, "Body must be JSON with 'vectors' (a list of query vectors) and 'top_k'")
+    if vectors.ndim != 2 or not 1 <= top_k <= MAX_TOP_K:
+        return _error(400, f"'vectors' must be a 2-D list and 'top_k' an integer in 1..{MAX_TOP_K}")
+    results = await asyncio.to_thread(store.search_batch, vectors, top_k, body.get("filter"))
+    return web.json_response({"results": [hits_json(hits) for hits in results]})
+
+async def shard_info(request: web.Request) -> web.Response:
+    store = _pipeline(request, "shard")
+    return web.json_response(describe_shard(store))
+
+async def _load_shard(app: web.Application, persist_dir: str):
+    state = app[STATE_KEY]
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        from src.vectorstore import FaissVectorStore
+        store = FaissVectorStore(persist_dir, read_only=True, query_cache_path=None)
+        if not store.exists():
+            raise FileNotFoundError(f"No shard built in {persist_dir}")
+        await asyncio.to_thread(store.load)
+        state["shard"] = store
+        state["ready"] = True
+        state["load_seconds"] = round(loop.time() - start, 3)
+        print(f"[INFO] Shard {store.manifest.get('shard')} ready in {state['load_seconds']:.2f}s")
+    except Exception as e:
+        state["error"] = f"{type(e).__name__}: {e}"
+        print(f"[ERROR] Failed to load shard {persist_dir}: {state['error']}")
+
+def create_shard_app(persist_dir: str) -> web.Application:
+    """
+    HTTP app serving one shard (read-only, memory-mapped) for a ShardedVectorStore on another
+    host: POST /shard/search and GET /shard/info, plus the usual health checks and /metrics.
+    Shards never load the embedding model; queries arrive as vectors.
+    """
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app[STATE_KEY] = {"ready": False, "error": None, "load_seconds": None, "services": ["shard"]}
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.router.add_post("/shard/search", shard_search)
+    app.router.add_get("/shard/info", shard_info)
+
+    async def on_startup(app: web.Application):
+        app[STATE_KEY]["task"] = asyncio.create_task(_load_shard(app, persist_dir))
+
+    app.on_startup.append(on_startup)
+    return app
+
+def create_app(rag_kwargs: Optional[Dict[str, Any]] = None, checker_kwargs: Optional[Dict[str, Any]] = None,
+               preload_model: Optional[str] = "all-MiniLM-L6-v2", batching: Optional[Dict[str, Any]] = None) -> web.Application:
+    """
+    Build the HTTP app for one worker. The pipelines are constructed in the background after
+    the server starts, so /healthz answers immediately and /readyz turns 200 once they are
+    loaded. Pass read_only=True in the kwargs to memory-map an index shared by all workers;
+    None for either kwargs disables that pipeline (its endpoints answer 404). batching, e.g.
+    {"max_wait_ms": 5, "max_batch": 32}, coalesces concurrent medical QA queries.
+    """
+    app = web.Application()
+    services = [name for name, kwargs in (("rag", rag_kwargs), ("checker", checker_kwargs)) if kwargs is not None]
+    app[STATE_KEY] = {"ready": False, "error": None, "load_seconds": None, "services": services}
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.router.add_post("/search", search)
+    app.router.add_post("/answer", answer)
+    app.router.add_post("/audit", audit)
+
+    async def on_startup(app: web.Application):
+        if preload_model:
+            # One embedding model per worker, loaded before the first query needs it
+            from src.model_registry import preload_embedding_model
+            preload_embedding_model(preload_model)
+        app[STATE_KEY]["task"] = asyncio.create_task(_load_pipelines(app, rag_kwargs, checker_kwargs, batching))
+
+    app.on_startup.append(on_startup)
+    return app
@@ -0,0 +1,106 @@
+import json
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from src import metrics
+
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_MAX_BATCH = 32
+
+class QueryBatcher:
+    """
+    Coalesces concurrent FaissVectorStore queries. Callers block in query() while a single
+    background thread collects requests for up to max_wait_ms after the first one arrives
+    (or until max_batch are waiting), embeds them in one forward pass, runs one batched
+    index search per distinct filter and hands each caller its own results.
+
+    A lone query waits at most max_wait_ms; under load, batches fill before the deadline and
+    the per-query cost drops to a fraction of a single-query encode.
+    """
+
+    def __init__(self, vectorstore, max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_batch: int = DEFAULT_MAX_BATCH):
+        self.vectorstore = vectorstore
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._thread.start()
+
+    def query(self, query_text: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("QueryBatcher is closed")
+            self._pending.append((query_text, top_k, filter, future, time.perf_counter()))
+            self._cond.notify()
+        with metrics.stage("batched_query"):
+            return future.result()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            deadline = self._pending[0][4] + self.max_wait
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self._process(batch)
+            except Exception as e:
+                for *_, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        with metrics.start_trace("query_batch") as trace:
+            trace.record("batch_wait", started - batch[0][4])
+            # One forward pass for every query in the batch (cached queries are not re-encoded)
+            vectors = self.vectorstore.embed_queries([item[0] for item in batch])
+            groups = {}
+            for i, (_, _, filter, _, _) in enumerate(batch):
+                groups.setdefault(json.dumps(filter, sort_keys=True, default=str) if filter else "", []).append(i)
+            for rows in groups.values():
+                top_k = max(batch[i][1] for i in rows)
+                results = self.vectorstore.search_batch(vectors[rows], top_k=top_k, filter=batch[rows[0]][2])
+                for i, hits in zip(rows, results):
+                    batch[i][3].set_result(hits[:batch[i][1]])
+        trace.registry.inc("rag_query_batches_total")
+        trace.registry.inc("rag_batched_queries_total", len(batch))
+        with self._cond:
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+    def close(self):
+        """Finish the queries already queued, then stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
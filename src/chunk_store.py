@@ -0,0 +1,124 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List
+
+# SQLite reads the database through a memory map up to this size, so chunk lookups are
+# served from the page cache instead of being copied into every process.
+DEFAULT_MMAP_SIZE = 1 << 30
+
+def _field_value(value: Any) -> str:
+    # Filter values are compared as text, so page=3 and page="3" match the same chunks
+    return str(value)
+
+class ChunkStore:
+    """
+    On-disk store of chunk text and metadata keyed by the chunk's faiss id. Nothing is
+    loaded up front; search() fetches only the rows for the ids a query returns.
+    Writes are buffered in a transaction until commit(), which FaissVectorStore.save()
+    calls right after writing the index. With read_only=True the database is opened
+    with mode=ro, so any number of worker processes can share it safely.
+
+    Scalar metadata fields (source, page, row, doc_type, medical_specialty, ...) are also
+    written to an indexed chunk_fields table so ids_matching() can resolve a filter to
+    chunk ids without reading any chunk text.
+    """
+
+    def __init__(self, path: str, mmap_size: int = DEFAULT_MMAP_SIZE, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No chunk store at {path}; build or migrate it without read_only first.")
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False, timeout=30)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        if not read_only:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, text TEXT, meta TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chunk_fields (id INTEGER, key TEXT, value TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_fields_key_value ON chunk_fields (key, value)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_fields_id ON chunk_fields (id)")
+            self._conn.commit()
+
+    def put_many(self, ids: Iterable[int], metadatas: Iterable[Dict[str, Any]]):
+        rows = []
+        fields = []
+        for cid, meta in zip(ids, metadatas):
+            extra = {k: v for k, v in meta.items() if k != "text"}
+            rows.append((int(cid), meta.get("text", ""), json.dumps(extra, default=str)))
+            fields.extend((int(cid), k, _field_value(v)) for k, v in extra.items()
+                          if isinstance(v, (str, int, float, bool)))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks (id, text, meta) VALUES (?, ?, ?)", rows)
+            self._conn.executemany("DELETE FROM chunk_fields WHERE id = ?", [(cid,) for cid, _, _ in rows])
+            self._conn.executemany("INSERT INTO chunk_fields (id, key, value) VALUES (?, ?, ?)", fields)
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Metadata (with "text") for each id that exists; missing ids are left out."""
+        ids = list({int(i) for i in ids})
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT id, text, meta FROM chunks WHERE id IN ({placeholders})", batch).fetchall()
+                for cid, text, meta in rows:
+                    record = json.loads(meta) if meta else {}
+                    record["text"] = text
+                    found[cid] = record
+        return found
+
+    def delete_many(self, ids: Iterable[int]):
+        rows = [(int(i),) for i in ids]
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", rows)
+            self._conn.executemany("DELETE FROM chunk_fields WHERE id = ?", rows)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chunk_fields")
+
+    def ids_matching(self, filter: Dict[str, Any]) -> List[int]:
+        """
+        Ids of chunks whose metadata matches every key of filter. A value may be a single
+        value or a list/tuple/set of accepted values.
+        """
+        clauses = []
+        params = []
+        for key, accepted in filter.items():
+            values = list(accepted) if isinstance(accepted, (list, tuple, set)) else [accepted]
+            if not values:
+                return []
+            placeholders = ",".join("?" * len(values))
+            clauses.append(f"SELECT id FROM chunk_fields WHERE key = ? AND value IN ({placeholders})")
+            params.extend([key] + [_field_value(v) for v in values])
+        if not clauses:
+            return self.all_ids()
+        with self._lock:
+            return [row[0] for row in self._conn.execute(" INTERSECT ".join(clauses) + " ORDER BY id", params)]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def all_ids(self) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM chunks ORDER BY id")]
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
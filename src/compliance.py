@@ -1,32 +1,61 @@
 import json
 import os
-import pandas as pd
-from typing import List, Dict
+import time
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-import google.generativeai as genai
 from src.vectorstore import FaissVectorStore
 from src.data_loader import load_all_documents
+from src.answer_cache import AnswerCache
+from src.answering import AnswerMixin
+from src.concurrency import TokenBucket, retry_with_backoff, run_bounded
+from src.llm import LLMBackend, get_llm_backend
+from src.context import DEFAULT_TOKEN_BUDGET, count_tokens
+from src import metrics
+from src.results import AnswerResult
 
 load_dotenv()
 
-class ComplianceChecker:
+POLICY_QA_PROMPT_TEMPLATE = """You are a Policy Expert. Answer the user's question based ONLY on the following policy context.
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+
+# Keys every compliance verdict from the LLM must have
+VERDICT_KEYS = ("status", "evidence", "remediation")
+
+class ComplianceChecker(AnswerMixin):
+    prompt_template = POLICY_QA_PROMPT_TEMPLATE
+
     def __init__(self, 
                  rules_path: str = "compliance_rules.json", 
                  data_dir: str = "data", 
                  persist_dir: str = "faiss_store_policy",
                  embedding_model: str = "all-MiniLM-L6-v2",
-                 model_name: str = "gemini-2.0-flash"):
+                 model_name: str = "gemini-2.0-flash",
+                 index_type: str = "flat",
+                 index_params: Optional[Dict[str, Any]] = None,
+                 answer_cache: Optional[AnswerCache] = None,
+                 llm: Optional[LLMBackend] = None,
+                 read_only: bool = False,
+                 context_token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                 refresh_index: bool = True):
         
         self.rules_path = rules_path
         self.persist_dir = persist_dir
-        self.vectorstore = FaissVectorStore(persist_dir, embedding_model)
+        self.read_only = read_only
+        self.refresh_index = refresh_index
+        self.vectorstore = FaissVectorStore(persist_dir, embedding_model, index_type=index_type, index_params=index_params,
+                                            read_only=read_only)
         
-        # Initialize Gemini
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        # Gemini (requires GOOGLE_API_KEY) unless another backend is passed in or LLM_BACKEND selects one
+        self.llm = llm or get_llm_backend(model_name=model_name)
+        self.model_name = self.llm.model_name
+        self.answer_cache = answer_cache or AnswerCache()
+        self.context_token_budget = context_token_budget
         
         # Load Rules
         with open(rules_path, 'r') as f:
@@ -36,37 +65,56 @@ class ComplianceChecker:
         self._initialize_vectorstore(data_dir)
 
     def _initialize_vectorstore(self, data_dir):
-        faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
-        
-        if not (os.path.exists(faiss_path) and os.path.exists(meta_path)):
-            print(f"[INFO] Building vector store for Policy Compliance from {data_dir}...")
-            
-            # Directly load only the Task 2 PDF
-            pdf_path = os.path.join(data_dir, "Task2_data.pdf")
-            if os.path.exists(pdf_path):
-                from langchain_community.document_loaders import PyPDFLoader
-                loader = PyPDFLoader(pdf_path)
-                policy_docs = loader.load()
-                print(f"[INFO] Loaded {len(policy_docs)} pages from {pdf_path}")
-            else:
-                print(f"[WARNING] {pdf_path} not found. Falling back to loading all docs.")
-                all_docs = load_all_documents(data_dir)
-                policy_docs = [d for d in all_docs if "Task2_data.pdf" in d.metadata.get("source", "")]
+        if self.vectorstore.exists():
+            print(f"[INFO] Loading existing vector store from {self.persist_dir}...")
+            self.vectorstore.load()
+        if self.read_only:
+            # Memory-mapped stores are built by a writable instance and only served here
+            return
+        if not self.refresh_index and self.vectorstore.exists():
+            # Fast start: serve the existing index without re-hashing the policy PDF
+            return
+
+        # Directly index only the Task 2 PDF; refresh() re-embeds it only if it changed
+        pdf_path = os.path.join(data_dir, "Task2_data.pdf")
+        if os.path.exists(pdf_path):
+            self.vectorstore.refresh([pdf_path])
+        elif not self.vectorstore.exists():
+            print(f"[WARNING] {pdf_path} not found. Falling back to loading all docs.")
+            all_docs = load_all_documents(data_dir)
+            policy_docs = [d for d in all_docs if "Task2_data.pdf" in d.metadata.get("source", "")]
 
             if not policy_docs:
                  raise ValueError("No documents found to build vector store.")
 
             self.vectorstore.build_from_documents(policy_docs)
-        else:
-            print(f"[INFO] Loading existing vector store from {self.persist_dir}...")
-            self.vectorstore.load()
 
-    def check_compliance(self, rule: Dict) -> Dict:
-        query = f"policy regarding {rule['category']} {rule['rule']}"
-        results = self.vectorstore.query(query, top_k=3)
-        texts = [r["metadata"].get("text", "") for r in results if r["metadata"]]
-        context = "\n\n".join(texts)
+    @staticmethod
+    def _rule_query(rule: Dict) -> str:
+        return f"policy regarding {rule['category']} {rule['rule']}"
+
+    def check_compliance(self, rule: Dict, results: Optional[List[Dict]] = None, max_retries: int = 3,
+                         timeout: Optional[float] = 60.0, rate_limiter: Optional[TokenBucket] = None) -> Dict:
+        """
+        Ask the LLM whether the policy complies with rule. Failed calls (including unparseable
+        replies) are retried with exponential backoff and each attempt waits on rate_limiter.
+        timeout is the budget for the whole check: each LLM call is given the time that is
+        left (backends that support it cut the call off), and no retry starts after it runs
+        out. Returns an "Error" status once retries or time run out. The verdict's "trace"
+        holds the per-stage timings and token counts of the check.
+        """
+        with metrics.start_trace("compliance_check") as trace:
+            verdict = self._check_compliance(rule, results, max_retries, timeout, rate_limiter, trace)
+        verdict["trace"] = trace.as_dict()
+        return verdict
+
+    def _check_compliance(self, rule: Dict, results: Optional[List[Dict]], max_retries: int, timeout: Optional[float],
+                          rate_limiter: Optional[TokenBucket], trace: metrics.Trace) -> Dict:
+        # results lets run_audit pass in context retrieved for all rules in one batch
+        if results is None:
+            with trace.stage("retrieval"):
+                results = self.vectorstore.query(self._rule_query(rule), top_k=3)
+        context, _, _ = self._pack_context(results)
         
         prompt = f"""You are a strict Compliance Officer. Evaluate if the company policy text provided below complies with the following rule.
 
@@ -88,26 +136,98 @@ Output Format (JSON):
   "remediation": "..."
 }}
 """
-        try:
-            response = self.model.generate_content(prompt)
+        trace.add_tokens("prompt", count_tokens(prompt))
+        attempts = []
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        def attempt():
+            if attempts:
+                trace.registry.inc("rag_llm_retries_total", pipeline=trace.pipeline)
+            attempts.append(1)
+            if rate_limiter is not None:
+                with trace.stage("rate_limit_wait"):
+                    rate_limiter.acquire()
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No time left for the LLM call (timeout {timeout}s)")
+            with trace.stage("llm_generate"):
+                text = self.llm.generate(prompt, timeout=remaining).strip()
+            trace.add_tokens("completion", count_tokens(text))
             # Clean up json block if present
-            text = response.text.strip()
             if text.startswith("```json"):
                 text = text[7:-3]
             elif text.startswith("```"):
                 text = text[3:-3]
             
-            result = json.loads(text)
-            return result
+            with trace.stage("parse"):
+                verdict = json.loads(text)
+            # Valid JSON that is not a verdict object counts as a failed attempt too
+            if not isinstance(verdict, dict) or any(key not in verdict for key in VERDICT_KEYS):
+                raise ValueError(f"Expected a JSON object with {', '.join(VERDICT_KEYS)}; got {text[:200]!r}")
+            return verdict
+
+        try:
+            return retry_with_backoff(attempt, max_retries=max_retries, deadline=deadline)
         except Exception as e:
             return {"status": "Error", "evidence": str(e), "remediation": "Check logs"}
 
-    def run_audit(self):
+    def answer_question(self, query: str, top_k: int = 5, stream: bool = False,
+                        timings: Optional[Dict[str, float]] = None) -> AnswerResult:
+        """
+        Answer a free-form question from the policy documents (the Policy Q&A tab) from one
+        embedding and one search. The result holds the answer (None if nothing relevant was
+        retrieved), the retrieved chunks with scores, whether the answer came from the answer
+        cache, the context packing stats and the timings. With stream=True the answer is
+        produced by iterating result.stream(). LLM errors are raised (from result.stream() when
+        streaming); the timings and trace are completed either way.
+        """
+        return self._answer(query, top_k, None, stream, timings, "policy_qa")
+
+    def stream_answer_question(self, query: str, top_k: int = 5, timings: Optional[Dict[str, float]] = None) -> AnswerResult:
+        """
+        Streaming variant of answer_question: retrieval happens immediately, and
+        result.stream() yields the answer as the LLM produces it. timings, if given, receives
+        "retrieval", "time_to_first_token" and "total" in seconds once the stream is exhausted.
+        """
+        return self.answer_question(query, top_k=top_k, stream=True, timings=timings)
+
+    def run_audit(self, max_workers: int = 4, requests_per_second: Optional[float] = None,
+                  max_retries: int = 3, timeout: Optional[float] = 60.0):
+        """
+        Check every rule, running up to max_workers LLM calls at once. requests_per_second
+        caps the overall call rate (token bucket shared by all workers, retries included).
+        timeout is a hard deadline per rule, retries and rate-limit waits included: a rule
+        still running after timeout seconds gets an "Error" row and its slot goes to the next
+        rule, even if the backend ignores the timeout passed to its calls. Rows are returned
+        in rule order regardless of completion order.
+        """
         audit_results = []
-        print(f"Starting audit on {len(self.rules)} rules...")
-        for rule in self.rules:
+        print(f"Starting audit on {len(self.rules)} rules with {max_workers} workers...")
+        retrieved = self.vectorstore.query_batch([self._rule_query(rule) for rule in self.rules], top_k=3)
+        limiter = TokenBucket(requests_per_second) if requests_per_second else None
+
+        def audit_rule(item):
+            rule, results = item
             print(f"Checking Rule {rule['id']}...")
-            compliance = self.check_compliance(rule)
+            return self.check_compliance(rule, results, max_retries=max_retries, timeout=timeout, rate_limiter=limiter)
+
+        start = time.perf_counter()
+        def timed_out(item):
+            rule, _ = item
+            print(f"[WARNING] Rule {rule['id']} did not finish within {timeout}s")
+            return {"status": "Error", "evidence": f"Timed out after {timeout}s", "remediation": "Check logs"}
+
+        verdicts = run_bounded(audit_rule, zip(self.rules, retrieved), max_workers=max_workers,
+                               timeout=timeout, on_timeout=timed_out)
+        stages = {}
+        for verdict in verdicts:
+            for name, seconds in verdict.get("trace", {}).get("stages", {}).items():
+                stages[name] = stages.get(name, 0.0) + seconds
+        print(f"[INFO] Audit finished in {time.perf_counter() - start:.2f}s; summed stage time: "
+              + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in sorted(stages.items(), key=lambda x: -x[1])))
+        for rule, compliance in zip(self.rules, verdicts):
             audit_results.append({
                 "Rule ID": rule['id'],
                 "Category": rule['category'],
@@ -118,6 +238,7 @@ Output Format (JSON):
                 "Remediation": compliance.get("remediation", "")
             })
         
+        import pandas as pd
         return pd.DataFrame(audit_results)
 
 if __name__ == "__main__":
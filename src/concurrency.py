@@ -0,0 +1,108 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `capacity` calls, refilled at `rate`
+    tokens per second. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def retry_with_backoff(fn: Callable[[], Any], max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                       retry_on: Tuple[Type[BaseException], ...] = (Exception,), deadline: Optional[float] = None) -> Any:
+    """
+    Call fn, retrying up to max_retries times on retry_on exceptions with exponential
+    backoff (base_delay * 2**attempt, capped at max_delay, with jitter). The last
+    exception is re-raised once retries are exhausted, or as soon as the next attempt
+    could not start before deadline (a time.monotonic() value).
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            print(f"[WARNING] Attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+def run_bounded(fn: Callable[[Any], Any], items: Iterable[Any], max_workers: int = 4, timeout: Optional[float] = None,
+                on_timeout: Optional[Callable[[Any], Any]] = None) -> List[Any]:
+    """
+    Apply fn to items on at most max_workers threads; results are returned in input order.
+    With timeout, an item still running timeout seconds after it started is abandoned: its
+    result becomes on_timeout(item) (a TimeoutError is raised if on_timeout is None) and its
+    slot goes to the next item, while the stuck call finishes on its own daemon thread.
+    """
+    items = list(items)
+    if timeout is None:
+        if max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(fn, items))
+
+    outcomes = {}
+    changed = threading.Condition()
+
+    def run(i: int):
+        try:
+            outcome = (True, fn(items[i]))
+        except BaseException as e:
+            outcome = (False, e)
+        with changed:
+            outcomes[i] = outcome
+            changed.notify()
+
+    results = [None] * len(items)
+    waiting = deque(range(len(items)))
+    running = {}
+    with changed:
+        while waiting or running:
+            while waiting and len(running) < max(1, max_workers):
+                i = waiting.popleft()
+                running[i] = time.monotonic() + timeout
+                threading.Thread(target=run, args=(i,), name=f"bounded-{i}", daemon=True).start()
+            now = time.monotonic()
+            for i, deadline in list(running.items()):
+                if i in outcomes:
+                    del running[i]
+                    ok, value = outcomes[i]
+                    if not ok:
+                        raise value
+                    results[i] = value
+                elif now >= deadline:
+                    del running[i]
+                    if on_timeout is None:
+                        raise TimeoutError(f"Item {i} did not finish within {timeout}s")
+                    results[i] = on_timeout(items[i])
+            if running and not any(i in outcomes for i in running):
+                changed.wait(max(0.0, min(running.values()) - time.monotonic()))
+    return results
@@ -0,0 +1,152 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TOKEN_BUDGET = 2000
+# Overlaps shorter than this are treated as coincidence rather than a shared chunk boundary
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 2000
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    # tiktoken is optional and may need to download its BPE file; fall back to an estimate
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"[WARNING] tiktoken unavailable ({e}); estimating tokens as characters / 4.")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * 4]
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if shorter than MIN_OVERLAP_CHARS)."""
+    for k in range(min(len(a), len(b), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+def _same_origin(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    # Chunks without a recorded source (older stores) may still be merged on text overlap alone
+    if a.get("source") is None or b.get("source") is None:
+        return True
+    return a.get("source") == b.get("source")
+
+def _merge(a: Dict[str, Any], b: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """a and b as one passage if b is contained in a or continues it, else None."""
+    if not _same_origin(a["meta"], b["meta"]):
+        return None
+    if b["text"] in a["text"]:
+        text = a["text"]
+    else:
+        k = _overlap(a["text"], b["text"])
+        if not k:
+            return None
+        text = a["text"] + b["text"][k:]
+    return {"text": text, "ids": a["ids"] + b["ids"], "rank": min(a["rank"], b["rank"]), "meta": a["meta"],
+            "members": a["members"] + b["members"]}
+
+def pack_context(results: List[Dict[str, Any]], token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                 dedup_threshold: float = 0.9, separator: str = "\n\n") -> Tuple[str, List[int], Dict[str, int]]:
+    """
+    Assemble the LLM context from search results (most relevant first). Chunks from the same
+    source whose text overlaps at a chunk boundary (chunk_overlap) are merged into one passage,
+    passages contained in or near-duplicates of (word 3-gram Jaccard >= dedup_threshold) a more
+    relevant one are dropped, and passages are added in relevance order while they fit in
+    token_budget (None for no limit). A merged passage that does not fit is split back into
+    its chunks, which are added in relevance order while they fit. Returns the context, the
+    ids of the chunks whose text it includes, and token counts before and after packing.
+    """
+    passages = []
+    for rank, r in enumerate(results):
+        meta = r.get("metadata")
+        if not meta or not meta.get("text"):
+            continue
+        passages.append({"text": meta["text"], "ids": [int(r["index"])], "rank": rank, "meta": meta,
+                         "members": [(rank, int(r["index"]), meta["text"])]})
+    input_tokens = count_tokens(separator.join(p["text"] for p in passages))
+    stats = {"chunks": len(passages), "merged": 0, "duplicates_removed": 0, "dropped_for_budget": 0}
+
+    # Merge pairs until none are left; top-k is small, so the quadratic scan is cheap
+    i = 0
+    while i < len(passages):
+        for j in range(len(passages)):
+            combined = _merge(passages[i], passages[j]) if i != j else None
+            if combined:
+                passages[i] = combined
+                del passages[j]
+                stats["merged"] += 1
+                i = -1
+                break
+        i += 1
+
+    passages.sort(key=lambda p: p["rank"])
+    kept = []
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        if any(passage["text"] in other["text"] or len(shingles & other_shingles) / max(1, len(shingles | other_shingles)) >= dedup_threshold
+               for other, other_shingles in kept):
+            stats["duplicates_removed"] += 1
+            continue
+        kept.append((passage, shingles))
+
+    parts = []
+    ids = []
+    used = 0
+    sep_tokens = count_tokens(separator)
+    for passage, _ in kept:
+        tokens = count_tokens(passage["text"]) + (sep_tokens if parts else 0)
+        if token_budget is None or used + tokens <= token_budget:
+            parts.append(passage["text"])
+            ids.extend(passage["ids"])
+            used += tokens
+            continue
+        # Too long as a whole: add its chunks on their own, most relevant first, so a merged
+        # passage never loses its best chunk to one it was merged with
+        members = sorted(passage["members"])
+        for rank, cid, text in members:
+            if any(text in part for part in parts):
+                ids.append(cid)
+                continue
+            tokens = count_tokens(text) + (sep_tokens if parts else 0)
+            if used + tokens <= token_budget:
+                parts.append(text)
+                ids.append(cid)
+                used += tokens
+            elif not parts:
+                # Never send an empty context just because the best chunk is too long;
+                # only the truncated chunk is reported as included
+                parts.append(_truncate(text, token_budget))
+                ids.append(cid)
+                used = token_budget
+            else:
+                stats["dropped_for_budget"] += 1
+
+    context = separator.join(parts)
+    stats["input_tokens"] = input_tokens
+    stats["packed_tokens"] = count_tokens(context) if parts else 0
+    stats["tokens_saved"] = input_tokens - stats["packed_tokens"]
+    return context, ids, stats
+
+def format_stats(stats: Dict[str, int]) -> str:
+    return (f"{stats['input_tokens']} -> {stats['packed_tokens']} tokens (saved {stats['tokens_saved']}; "
+            f"merged {stats['merged']}, deduplicated {stats['duplicates_removed']}, "
+            f"dropped {stats['dropped_for_budget']} over budget)")
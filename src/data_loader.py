@@ -1,108 +1,182 @@
+import os
+import csv
+import time
 from pathlib import Path
-from typing import List, Any
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, CSVLoader
-from langchain_community.document_loaders import Docx2txtLoader
-from langchain_community.document_loaders.excel import UnstructuredExcelLoader
-from langchain_community.document_loaders import JSONLoader
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-def load_all_documents(data_dir: str) -> List[Any]:
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".csv", ".xlsx", ".docx", ".json")
+
+def _make_loader(file_path: Path):
+    # Loaders are imported per file type: LangChain and the Unstructured/Excel stack are slow
+    # to import and not needed at all when the index is already up to date
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        from langchain_community.document_loaders import PyPDFLoader
+        return PyPDFLoader(str(file_path))
+    if suffix == ".txt":
+        from langchain_community.document_loaders import TextLoader
+        return TextLoader(str(file_path))
+    if suffix == ".csv":
+        from langchain_community.document_loaders import CSVLoader
+        # Check if it's the medical dataset and use 'transcription' column
+        loader_kwargs = {"encoding": "utf-8"}
+        if "Task1_data.csv" in file_path.name:
+            loader_kwargs["source_column"] = "transcription"
+            # Copy the specialty and sample name into metadata for filtered search while keeping
+            # every column in the text, so chunk text (and its embedding) is unchanged
+            with open(file_path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+            loader_kwargs["metadata_columns"] = [c for c in ("medical_specialty", "sample_name") if c in header]
+            loader_kwargs["content_columns"] = header
+        return CSVLoader(str(file_path), **loader_kwargs)
+    if suffix == ".xlsx":
+        from langchain_community.document_loaders.excel import UnstructuredExcelLoader
+        return UnstructuredExcelLoader(str(file_path))
+    if suffix == ".docx":
+        from langchain_community.document_loaders import Docx2txtLoader
+        return Docx2txtLoader(str(file_path))
+    if suffix == ".json":
+        from langchain_community.document_loaders import JSONLoader
+        return JSONLoader(str(file_path))
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+def list_supported_files(data_dir: str) -> List[str]:
     """
-    Load all supported files from the data directory and convert to LangChain document structure.
-    Supported: PDF, TXT, CSV, Excel, Word, JSON
+    Return the paths of all supported files under data_dir, sorted for a stable order.
     """
-    # Use project root data folder
-    data_path = Path(data_dir).resolve()
-    print(f"[DEBUG] Data path: {data_path}")
-    documents = []
+    data_path = Path(data_dir)
+    if not data_path.is_dir():
+        return []
+    return sorted(str(p) for p in data_path.glob('**/*')
+                  if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
 
-    # PDF files
-    pdf_files = list(data_path.glob('**/*.pdf'))
-    print(f"[DEBUG] Found {len(pdf_files)} PDF files: {[str(f) for f in pdf_files]}")
-    for pdf_file in pdf_files:
-        print(f"[DEBUG] Loading PDF: {pdf_file}")
-        try:
-            loader = PyPDFLoader(str(pdf_file))
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} PDF docs from {pdf_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load PDF {pdf_file}: {e}")
+def load_file(file_path: str) -> List[Any]:
+    """
+    Load a single supported file into LangChain documents.
+    """
+    return _make_loader(Path(file_path)).load()
 
-    # TXT files
-    txt_files = list(data_path.glob('**/*.txt'))
-    print(f"[DEBUG] Found {len(txt_files)} TXT files: {[str(f) for f in txt_files]}")
-    for txt_file in txt_files:
-        print(f"[DEBUG] Loading TXT: {txt_file}")
-        try:
-            loader = TextLoader(str(txt_file))
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} TXT docs from {txt_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load TXT {txt_file}: {e}")
+def iter_file(file_path: str) -> Iterator[Any]:
+    """
+    Yield a file's documents one at a time (a page, row or file per document, depending
+    on the loader) without materialising the whole file.
+    """
+    return _make_loader(Path(file_path)).lazy_load()
 
-    # CSV files
-    csv_files = list(data_path.glob('**/*.csv'))
-    print(f"[DEBUG] Found {len(csv_files)} CSV files: {[str(f) for f in csv_files]}")
-    for csv_file in csv_files:
-        print(f"[DEBUG] Loading CSV: {csv_file}")
-        try:
-            # Check if it's the medical dataset and use 'transcription' column
-            loader_kwargs = {"encoding": "utf-8"}
-            if "Task1_data.csv" in csv_file.name:
-                 loader_kwargs["source_column"] = "transcription"
-            
-            loader = CSVLoader(str(csv_file), **loader_kwargs)
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} CSV docs from {csv_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load CSV {csv_file}: {e}")
+def _load_timed(file_path: str) -> Tuple[List[Any], float, Optional[str]]:
+    # Runs in a worker process, so failures come back as data rather than exceptions
+    start = time.perf_counter()
+    try:
+        docs = load_file(file_path)
+        return docs, time.perf_counter() - start, None
+    except Exception as e:
+        return [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
 
-    # Excel files
-    xlsx_files = list(data_path.glob('**/*.xlsx'))
-    print(f"[DEBUG] Found {len(xlsx_files)} Excel files: {[str(f) for f in xlsx_files]}")
-    for xlsx_file in xlsx_files:
-        print(f"[DEBUG] Loading Excel: {xlsx_file}")
-        try:
-            loader = UnstructuredExcelLoader(str(xlsx_file))
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} Excel docs from {xlsx_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load Excel {xlsx_file}: {e}")
+class FilePrefetcher:
+    """
+    Parses files ahead of their use: documents(path), called for paths in order, returns the
+    documents of that file while up to max_workers of the following files are parsed in a
+    process pool. With one worker (or one file) nothing is prefetched and documents() streams
+    the file lazily in this process, as iter_file() does. A loader error is raised by
+    documents() for that file only.
+    """
+
+    def __init__(self, paths: List[str], max_workers: Optional[int] = None):
+        self.paths = list(paths)
+        self.workers = min(max_workers or os.cpu_count() or 1, len(self.paths))
+        self._executor = None
+        self._futures = {}
+        self._next = 0
+        if self.workers > 1:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            except OSError as e:
+                print(f"[WARNING] Process pool unavailable ({e}); loading files serially.")
+        self._fill()
 
-    # Word files
-    docx_files = list(data_path.glob('**/*.docx'))
-    print(f"[DEBUG] Found {len(docx_files)} Word files: {[str(f) for f in docx_files]}")
-    for docx_file in docx_files:
-        print(f"[DEBUG] Loading Word: {docx_file}")
+    def _fill(self):
+        # Keep one file in flight per worker, so at most that many parsed files wait in memory
+        while self._executor is not None and self._next < len(self.paths) and len(self._futures) < self.workers:
+            path = self.paths[self._next]
+            self._futures[path] = self._executor.submit(load_file, path)
+            self._next += 1
+
+    def documents(self, path: str) -> Iterable[Any]:
+        future = self._futures.pop(path, None)
+        if future is None:
+            return iter_file(path)
         try:
-            loader = Docx2txtLoader(str(docx_file))
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} Word docs from {docx_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load Word {docx_file}: {e}")
+            docs = future.result()
+        except BrokenProcessPool as e:
+            print(f"[WARNING] Process pool failed ({e}); loading the remaining files serially.")
+            self.close()
+            return iter_file(path)
+        finally:
+            self._fill()
+        return docs
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
 
-    # JSON files
-    json_files = list(data_path.glob('**/*.json'))
-    print(f"[DEBUG] Found {len(json_files)} JSON files: {[str(f) for f in json_files]}")
-    for json_file in json_files:
-        print(f"[DEBUG] Loading JSON: {json_file}")
+def load_documents(data_dir: str, max_workers: Optional[int] = None) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Load every supported file under data_dir in one directory scan, parsing files in a
+    process pool. Documents come back in sorted file path order regardless of which worker
+    finished first. The summary has one entry per file (path, type, documents, seconds,
+    error) plus totals; a file that fails to parse is recorded there and skipped.
+    """
+    start = time.perf_counter()
+    files = list_supported_files(data_dir)
+    workers = min(max_workers or os.cpu_count() or 1, len(files))
+    results = None
+    if workers > 1:
         try:
-            loader = JSONLoader(str(json_file))
-            loaded = loader.load()
-            print(f"[DEBUG] Loaded {len(loaded)} JSON docs from {json_file}")
-            documents.extend(loaded)
-        except Exception as e:
-            print(f"[ERROR] Failed to load JSON {json_file}: {e}")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_load_timed, files))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"[WARNING] Process pool unavailable ({e}); loading files serially.")
+    if results is None:
+        results = [_load_timed(path) for path in files]
+
+    documents = []
+    entries = []
+    for path, (docs, seconds, error) in zip(files, results):
+        documents.extend(docs)
+        entries.append({"path": path, "type": Path(path).suffix.lower().lstrip("."),
+                        "documents": len(docs), "seconds": round(seconds, 4), "error": error})
+    summary = {
+        "data_dir": str(Path(data_dir).resolve()),
+        "files": entries,
+        "loaded": sum(1 for e in entries if e["error"] is None),
+        "failed": sum(1 for e in entries if e["error"] is not None),
+        "documents": len(documents),
+        "workers": max(workers, 1),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    return documents, summary
 
-    print(f"[DEBUG] Total loaded documents: {len(documents)}")
+def load_all_documents(data_dir: str, max_workers: Optional[int] = None) -> List[Any]:
+    """
+    Load all supported files from the data directory and convert to LangChain document structure.
+    Supported: PDF, TXT, CSV, Excel, Word, JSON. Use load_documents() for the per-file summary.
+    """
+    documents, summary = load_documents(data_dir, max_workers=max_workers)
+    print(f"[INFO] Loaded {summary['documents']} documents from {summary['loaded']} files in {summary['data_dir']} "
+          f"in {summary['seconds']:.2f}s ({summary['workers']} workers, {summary['failed']} failed)")
+    for entry in summary["files"]:
+        if entry["error"]:
+            print(f"[ERROR] Failed to load {entry['path']}: {entry['error']}")
     return documents
 
 # Example usage
 if __name__ == "__main__":
-    docs = load_all_documents("data")
+    docs, summary = load_documents("data")
+    for entry in summary["files"]:
+        print(f"{entry['path']}: {entry['documents']} docs in {entry['seconds']:.2f}s {entry['error'] or ''}")
     print(f"Loaded {len(docs)} documents.")
     print("Example document:", docs[0] if docs else None)
\ No newline at end of file
@@ -1,34 +1,87 @@
-from typing import List, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+import time
+from typing import Any, Iterable, Iterator, List, Optional
 import numpy as np
 from src.data_loader import load_all_documents
+from src.model_registry import get_embedding_model, embedding_key, resolve_backend
+from src.embedding_cache import ChunkEmbeddingCache, DEFAULT_CHUNK_CACHE_DIR
+from src.encode_pool import EncodePool, DEFAULT_ENCODE_BATCH_SIZE
 
 class EmbeddingPipeline:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 1000, chunk_overlap: int = 200,
+                 cache_dir: Optional[str] = DEFAULT_CHUNK_CACHE_DIR, backend: Optional[str] = None,
+                 encode_processes: int = 1, encode_batch_size: int = DEFAULT_ENCODE_BATCH_SIZE):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.model = SentenceTransformer(model_name)
-        print(f"[INFO] Loaded embedding model: {model_name}")
+        self.model_name = model_name
+        # torch, onnx or int8 (src/model_registry.py); None reads EMBEDDING_BACKEND
+        self.backend = resolve_backend(backend)
+        # Chunk embeddings are looked up by text hash before encoding; None disables the cache
+        self.cache = ChunkEmbeddingCache(embedding_key(model_name, self.backend), cache_dir) if cache_dir else None
+        # Length-sorted batches, spread over encode_processes worker processes when > 1
+        self.pool = EncodePool(model_name, self.backend, processes=encode_processes, batch_size=encode_batch_size)
 
-    def chunk_documents(self, documents: List[Any]) -> List[Any]:
-        splitter = RecursiveCharacterTextSplitter(
+    @property
+    def model(self):
+        # Shared per process; loaded on first encode rather than at construction
+        return get_embedding_model(self.model_name, self.backend)
+
+    def _splitter(self):
+        # Imported on first use: only builds and refreshes split text
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
-        chunks = splitter.split_documents(documents)
+
+    def chunk_documents(self, documents: List[Any]) -> List[Any]:
+        chunks = self._splitter().split_documents(documents)
         print(f"[INFO] Split {len(documents)} documents into {len(chunks)} chunks.")
         return chunks
 
+    def iter_chunks(self, documents: Iterable[Any]) -> Iterator[Any]:
+        """Split documents one at a time, yielding the same chunks as chunk_documents() lazily."""
+        splitter = self._splitter()
+        for doc in documents:
+            yield from splitter.split_documents([doc])
+
+    def _encode(self, texts: List[str], verbose: bool = False) -> np.ndarray:
+        """Encode texts, taking cached vectors where possible; the model is only loaded for misses."""
+        cached = self.cache.get_many(texts) if self.cache else [None] * len(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            start = time.perf_counter()
+            encoded = self.pool.encode([texts[i] for i in missing])
+            if verbose:
+                seconds = time.perf_counter() - start
+                print(f"[INFO] Encoded {len(missing)} chunks in {seconds:.2f}s "
+                      f"({len(missing) / max(seconds, 1e-9):.1f} chunks/sec, {self.backend}, {self.pool.processes} process(es))")
+            if self.cache:
+                self.cache.put_many([texts[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+        return np.vstack(cached).astype('float32')
+
     def embed_chunks(self, chunks: List[Any]) -> np.ndarray:
         texts = [chunk.page_content for chunk in chunks]
         print(f"[INFO] Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        embeddings = self._encode(texts, verbose=True)
+        if self.cache:
+            print(f"[INFO] Chunk embedding cache: {self.cache.stats()}")
         print(f"[INFO] Embeddings shape: {embeddings.shape}")
         return embeddings
 
+    def embed_batch(self, chunks: List[Any]) -> np.ndarray:
+        """Quiet variant of embed_chunks() for streaming ingestion, which calls it per batch."""
+        return self._encode([chunk.page_content for chunk in chunks])
+
+    def close(self):
+        """Stop the encode worker processes, if any were started."""
+        self.pool.close()
+
 # Example usage
 if __name__ == "__main__":
     
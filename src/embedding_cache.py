@@ -0,0 +1,188 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+
+DEFAULT_QUERY_CACHE_PATH = os.path.join(".cache", "query_embeddings.sqlite")
+
+def normalize_query(text: str) -> str:
+    # Collapse whitespace only; case is left alone because it can change the embedding
+    return " ".join(text.split())
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings keyed by (model name, normalized text): a bounded
+    in-memory LRU in front of a SQLite file that persists across restarts and processes.
+    Pass cache_path=None for a memory-only cache.
+    """
+
+    def __init__(self, model_name: str, cache_path: Optional[str] = DEFAULT_QUERY_CACHE_PATH, max_entries: int = 1024):
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors in input order, None for texts that must be encoded."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+            disk_keys = list({k for k in keys if k not in found})
+            if disk_keys and self._conn is not None:
+                placeholders = ",".join("?" * len(disk_keys))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM query_embeddings WHERE key IN ({placeholders})", disk_keys).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype='float32')
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+            self.misses += sum(1 for k in keys if k not in found)
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype='float32')
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self._key(text)
+                self._remember(key, vector.copy())
+                rows.append((key, vector.tobytes()))
+            if self._conn is not None and rows:
+                self._conn.executemany("INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)", rows)
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+DEFAULT_CHUNK_CACHE_DIR = os.path.join(".cache", "chunk_embeddings")
+
+def hash_text(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class ChunkEmbeddingCache:
+    """
+    Content-addressed cache of chunk embeddings keyed by (model name, sha1 of the chunk text),
+    so a rebuild with another index type or chunking only encodes text it has never seen.
+    Vectors are appended to one raw float32 matrix per model and located through a SQLite
+    index of row numbers; lookups read just the rows they need through a memory map.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_CHUNK_CACHE_DIR):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16]
+        self.matrix_path = os.path.join(cache_dir, f"{slug}.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False, timeout=30)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunk_embeddings "
+                           "(model TEXT, text_hash TEXT, row INTEGER, PRIMARY KEY (model, text_hash))")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _dim(self) -> Optional[int]:
+        row = self._conn.execute("SELECT dim FROM models WHERE model = ?", (self.model_name,)).fetchone()
+        return row[0] if row else None
+
+    def _rows(self, hashes: List[str]) -> Dict[str, int]:
+        rows = {}
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(
+                f"SELECT text_hash, row FROM chunk_embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name] + batch).fetchall())
+        return rows
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors in input order, None for texts that must be encoded."""
+        hashes = [hash_text(t) for t in texts]
+        with self._lock:
+            dim = self._dim()
+            rows = self._rows(list(set(hashes))) if dim else {}
+        found = [None] * len(texts)
+        if rows and os.path.exists(self.matrix_path):
+            n_rows = os.path.getsize(self.matrix_path) // (dim * 4)
+            matrix = np.memmap(self.matrix_path, dtype='float32', mode='r', shape=(n_rows, dim))
+            for i, h in enumerate(hashes):
+                if h in rows and rows[h] < n_rows:
+                    found[i] = np.array(matrix[rows[h]])
+            del matrix
+        hits = sum(1 for v in found if v is not None)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        return found
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if not len(texts):
+            return
+        unique = {}
+        for text, vector in zip(texts, vectors):
+            unique.setdefault(hash_text(text), vector)
+        with self._lock:
+            # BEGIN IMMEDIATE serialises appends from concurrent processes sharing the cache
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                dim = self._dim()
+                if dim is None:
+                    dim = vectors.shape[1]
+                    self._conn.execute("INSERT INTO models (model, dim) VALUES (?, ?)", (self.model_name, dim))
+                elif dim != vectors.shape[1]:
+                    raise ValueError(f"Cached embeddings for {self.model_name} have dimension {dim}, got {vectors.shape[1]}")
+                existing = self._rows(list(unique))
+                new = [(h, v) for h, v in unique.items() if h not in existing]
+                if new:
+                    with open(self.matrix_path, "a+b") as f:
+                        # Drop a partial row left by an interrupted write before appending
+                        first_row = os.path.getsize(self.matrix_path) // (dim * 4)
+                        f.truncate(first_row * dim * 4)
+                        f.write(np.stack([v for _, v in new]).tobytes())
+                    self._conn.executemany(
+                        "INSERT INTO chunk_embeddings (model, text_hash, row) VALUES (?, ?, ?)",
+                        [(self.model_name, h, first_row + i) for i, (h, _) in enumerate(new)])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
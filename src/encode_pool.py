@@ -0,0 +1,87 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional
+import numpy as np
+from src.model_registry import get_embedding_model, resolve_backend
+
+DEFAULT_ENCODE_BATCH_SIZE = 64
+
+# Set in each worker process by _init_worker()
+_worker_model: Any = None
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    global _worker_model
+    # Split the cores between workers instead of every worker starting one thread per core
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = get_embedding_model(model_name, backend)
+
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype='float32')
+
+def length_sorted_batches(texts: List[str], batch_size: int) -> List[List[int]]:
+    """
+    Indices of texts grouped into batches of similar length, longest first, so each batch
+    pads to little more than its own longest text and the slowest batches start first.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+class EncodePool:
+    """
+    Encodes texts on `processes` worker processes, each holding its own copy of the model
+    on the chosen backend (see src/model_registry.py). Texts are sorted by length and
+    split into batches, the batches are spread over the workers, and the vectors come back
+    in input order. With processes=1 the same length-sorted batches are encoded in this
+    process with the shared model. Workers are started on the first encode and stay up
+    until close().
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", backend: Optional[str] = None, processes: int = 1,
+                 batch_size: int = DEFAULT_ENCODE_BATCH_SIZE):
+        self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            # spawn, not fork: a forked copy of a loaded torch model can deadlock in its thread pool
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker, initargs=(self.model_name, self.backend, threads))
+            print(f"[INFO] Started {self.processes} encode workers ({self.backend}, {threads} threads each)")
+        return self._executor
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+        batches = length_sorted_batches(texts, self.batch_size)
+        if self.processes == 1:
+            model = get_embedding_model(self.model_name, self.backend)
+            parts = [np.asarray(model.encode([texts[i] for i in batch], batch_size=self.batch_size, show_progress_bar=False),
+                                dtype='float32') for batch in batches]
+        else:
+            parts = list(self._pool().map(_encode_batch, [[texts[i] for i in batch] for batch in batches],
+                                          [self.batch_size] * len(batches)))
+        vectors = np.empty((len(texts), parts[0].shape[1]), dtype='float32')
+        for batch, part in zip(batches, parts):
+            vectors[batch] = part
+        return vectors
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+import os
+import json
+import math
+import faiss
+import numpy as np
+from typing import Any, Dict, Optional
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Build parameters change the index structure (changing them needs a rebuild);
+# search parameters (nprobe, ef_search) can be retuned on a loaded index.
+DEFAULT_PARAMS = {
+    "flat": {},
+    "ivf_flat": {"nlist": 1024, "nprobe": 16, "train_size": 65536},
+    "ivf_pq": {"nlist": 1024, "nprobe": 16, "pq_m": 48, "pq_bits": 8, "train_size": 65536},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+}
+SEARCH_PARAMS = ("nprobe", "ef_search")
+CONFIG_FILE = "index_config.json"
+
+# Optional build parameters for every index type except ivf_pq (which already compresses):
+#   storage: how vectors are stored; float16 halves and int8 quarters float32 memory
+#   pca_dim: reduce vectors to this many dimensions with a trained PCA before storage
+STORAGE_CODECS = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+OPTIONAL_DEFAULTS = {"storage": "float32", "pca_dim": 0}
+# Sample size for int8 ranges / PCA when the index type has no train_size of its own
+DEFAULT_TRAIN_SIZE = 65536
+
+
+def resolve_config(index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge user parameters over the defaults for index_type."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+    params = dict(DEFAULT_PARAMS[index_type])
+    params.update(index_params or {})
+    storage = params.get("storage", "float32")
+    if storage not in STORAGE_CODECS:
+        raise ValueError(f"Unknown storage '{storage}'. Expected one of {tuple(STORAGE_CODECS)}.")
+    if index_type == "ivf_pq" and (storage != "float32" or params.get("pca_dim")):
+        raise ValueError("ivf_pq already compresses vectors; storage and pca_dim apply to flat, ivf_flat and hnsw.")
+    return {"index_type": index_type, "params": params}
+
+
+def build_signature(config: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a config that determines index structure, used to detect when a rebuild is needed."""
+    params = {}
+    for key, value in config["params"].items():
+        if key in SEARCH_PARAMS or key == "train_size":
+            continue
+        # Leaving an optional parameter at its default must not look like a different build
+        if key in OPTIONAL_DEFAULTS and (value or OPTIONAL_DEFAULTS[key]) == OPTIONAL_DEFAULTS[key]:
+            continue
+        params[key] = value
+    return {"index_type": config["index_type"], "params": params}
+
+
+def train_size(config: Dict[str, Any]) -> int:
+    """Number of vectors to collect before training; 0 for index types that need no training."""
+    params = config["params"]
+    if config["index_type"] in ("ivf_flat", "ivf_pq"):
+        return int(params["train_size"])
+    if params.get("storage") == "int8" or params.get("pca_dim"):
+        return int(params.get("train_size", DEFAULT_TRAIN_SIZE))
+    return 0
+
+
+def stores_exact_vectors(config: Dict[str, Any]) -> bool:
+    """True if the index keeps the vectors as given and reports exact L2 to them (flat and ivf_flat, float32, no PCA)."""
+    params = config["params"]
+    return (config["index_type"] in ("flat", "ivf_flat") and params.get("storage", "float32") == "float32"
+            and not params.get("pca_dim"))
+
+
+def _largest_divisor_at_most(n: int, limit: int) -> int:
+    for m in range(min(n, limit), 0, -1):
+        if n % m == 0:
+            return m
+    return 1
+
+
+def create_index(config: Dict[str, Any], dim: int, num_train: int) -> faiss.Index:
+    """
+    Create an untrained index for config that accepts caller-assigned int64 ids. Flat and
+    HNSW indexes are wrapped in IndexIDMap2; IVF indexes store ids natively (IndexIDMap
+    cannot remove from them correctly) and keep a hashtable direct map for reconstruct(). IVF list counts and PQ code
+    sizes are clamped to what num_train sample vectors can train; the values actually used
+    are recorded in config["resolved"] so they are persisted with the index. A pca_dim
+    puts a PCA transform in front of the index, which is then built on the reduced vectors.
+    """
+    index_type = config["index_type"]
+    params = dict(config["params"])
+    codec = STORAGE_CODECS[params.get("storage", "float32")]
+    pca_dim = int(params.get("pca_dim") or 0)
+    if pca_dim:
+        # PCA can't produce more components than there are dimensions or training vectors
+        pca_dim = max(1, min(pca_dim, dim, num_train))
+        params["pca_dim"] = pca_dim
+    work_dim = pca_dim or dim
+    if index_type == "flat":
+        description = codec
+    elif index_type == "hnsw":
+        description = f"HNSW{params['hnsw_m']},{codec}"
+    else:
+        # faiss wants ~39 training points per centroid
+        nlist = max(1, min(int(params["nlist"]), num_train // 39))
+        params["nlist"] = nlist
+        if index_type == "ivf_flat":
+            description = f"IVF{nlist},{codec}"
+        else:
+            pq_m = _largest_divisor_at_most(work_dim, int(params["pq_m"]))
+            pq_bits = int(params["pq_bits"])
+            if num_train < 2 ** pq_bits:
+                pq_bits = max(1, int(math.log2(max(num_train, 2))))
+            params["pq_m"], params["pq_bits"] = pq_m, pq_bits
+            description = f"IVF{nlist},PQ{pq_m}x{pq_bits}"
+    if pca_dim:
+        description = f"PCA{pca_dim},{description}"
+    inner = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        _base_index(inner).hnsw.efConstruction = int(params["ef_construction"])
+    config["resolved"] = params
+    config["factory"] = description
+    if index_type in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(inner).set_direct_map_type(faiss.DirectMap.Hashtable)
+        index = inner
+    else:
+        index = faiss.IndexIDMap2(inner)
+    apply_search_params(index, config)
+    return index
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """The index that holds the vectors, below any IndexIDMap2 and PCA wrappers."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def stored_ids(index: faiss.Index) -> np.ndarray:
+    """The ids of every vector in index: the IndexIDMap2 id map, the IVF lists, or 0..ntotal-1 for legacy flat indexes."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype('int64')
+    if isinstance(_base_index(index), faiss.IndexIVF):
+        invlists = faiss.extract_index_ivf(index).invlists
+        lists = [faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+                 for l in range(invlists.nlist) if invlists.list_size(l)]
+        return np.concatenate(lists).astype('int64') if lists else np.zeros(0, dtype='int64')
+    return np.arange(index.ntotal, dtype='int64')
+
+
+def supports_ids(index: faiss.Index) -> bool:
+    """True if index was built by create_index, i.e. can add and remove by chunk id."""
+    return isinstance(index, faiss.IndexIDMap2) or isinstance(_base_index(index), faiss.IndexIVF)
+
+
+def train_index(index: faiss.Index, embeddings: np.ndarray, config: Dict[str, Any], seed: int = 0):
+    """Train index on a random sample of at most train_size rows of embeddings."""
+    if index.is_trained:
+        return
+    limit = train_size(config) or embeddings.shape[0]
+    if embeddings.shape[0] > limit:
+        rows = np.random.default_rng(seed).choice(embeddings.shape[0], limit, replace=False)
+        embeddings = embeddings[np.sort(rows)]
+    print(f"[INFO] Training {config.get('factory', config['index_type'])} index on {embeddings.shape[0]} vectors...")
+    index.train(embeddings)
+
+
+def apply_search_params(index: faiss.Index, config: Dict[str, Any]):
+    """Push nprobe / ef_search from config onto a live index."""
+    params = config["params"]
+    if config["index_type"] in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = int(params["nprobe"])
+    elif config["index_type"] == "hnsw":
+        _base_index(index).hnsw.efSearch = int(params["ef_search"])
+
+
+def search_parameters(config: Dict[str, Any], selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """Per-call search parameters that restrict a search to selector, keeping config's nprobe / ef_search."""
+    params = config["params"]
+    if config["index_type"] in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=int(params["nprobe"]))
+    if config["index_type"] == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=int(params["ef_search"]))
+    return faiss.SearchParameters(sel=selector)
+
+
+def save_config(persist_dir: str, config: Dict[str, Any]):
+    path = os.path.join(persist_dir, CONFIG_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_config(persist_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(persist_dir, CONFIG_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
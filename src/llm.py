@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import AsyncIterator, Callable, Iterator, Optional, Union
+
+class LLMBackend:
+    """
+    Interface the RAG pipelines use to talk to a language model. Subclasses implement
+    generate() and usually stream(); the async variants default to running the sync
+    ones on a worker thread.
+    """
+
+    model_name = "unknown"
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        yield self.generate(prompt, timeout=timeout)
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return await asyncio.to_thread(self.generate, prompt, timeout)
+
+    async def astream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        tokens = self.stream(prompt, timeout=timeout)
+        done = object()
+        while True:
+            token = await asyncio.to_thread(next, tokens, done)
+            if token is done:
+                return
+            yield token
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model_name: str = "gemini-2.0-flash", api_key: Optional[str] = None, require_api_key: bool = True):
+        import google.generativeai as genai
+
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            if require_api_key:
+                raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+            print("[WARNING] GOOGLE_API_KEY not found in environment variables.")
+        else:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        print(f"[INFO] Gemini LLM initialized: {self.model_name}")
+
+    @staticmethod
+    def _request_options(timeout: Optional[float]):
+        return {"timeout": timeout} if timeout else None
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return self.model.generate_content(prompt, request_options=self._request_options(timeout)).text
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, request_options=self._request_options(timeout)):
+            if chunk.text:
+                yield chunk.text
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        response = await self.model.generate_content_async(prompt, request_options=self._request_options(timeout))
+        return response.text
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for Gemini, for load tests and profiling without network
+    access. Replies after `latency` seconds (the simulated time to first token); stream()
+    then yields one word every `token_delay` seconds. `response` may be a fixed string, a
+    template formatted with {prompt_chars} and {prompt_hash}, or a callable of the prompt.
+    By default compliance prompts get a JSON verdict derived from the prompt hash and all
+    other prompts a short templated answer.
+    """
+
+    STATUSES = ("Compliant", "Non-Compliant", "Missing")
+
+    def __init__(self, model_name: str = "stub", response: Union[str, Callable[[str], str], None] = None,
+                 latency: float = 0.0, token_delay: float = 0.0):
+        self.model_name = model_name
+        self.response = response
+        self.latency = latency
+        self.token_delay = token_delay
+
+    def _reply(self, prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        if callable(self.response):
+            return self.response(prompt)
+        if self.response is not None:
+            return self.response.format(prompt_chars=len(prompt), prompt_hash=digest[:8])
+        if '"status"' in prompt:
+            status = self.STATUSES[int(digest, 16) % len(self.STATUSES)]
+            return json.dumps({"status": status, "evidence": f"Stub evidence {digest[:8]}",
+                               "remediation": "" if status == "Compliant" else "Stub remediation"})
+        return (f"Stub answer {digest[:8]} based on {len(prompt)} characters of prompt. "
+                "Please consult a doctor for professional advice.")
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        time.sleep(self.latency)
+        return self._reply(prompt)
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        time.sleep(self.latency)
+        words = self._reply(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        await asyncio.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def astream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency)
+        words = self._reply(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+def get_llm_backend(backend: Optional[str] = None, model_name: str = "gemini-2.0-flash",
+                    require_api_key: bool = True, **kwargs) -> LLMBackend:
+    """
+    Build the LLM backend named by `backend`, or by the LLM_BACKEND environment variable
+    ("gemini" by default, or "stub"). The stub's latency can be set with LLM_STUB_LATENCY
+    and LLM_STUB_TOKEN_DELAY (seconds).
+    """
+    backend = (backend or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if backend == "gemini":
+        return GeminiBackend(model_name, require_api_key=require_api_key, **kwargs)
+    if backend == "stub":
+        kwargs.setdefault("latency", float(os.getenv("LLM_STUB_LATENCY", "0")))
+        kwargs.setdefault("token_delay", float(os.getenv("LLM_STUB_TOKEN_DELAY", "0")))
+        return StubBackend(**kwargs)
+    raise ValueError(f"Unknown LLM backend '{backend}'. Expected 'gemini' or 'stub'.")
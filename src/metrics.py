@@ -0,0 +1,243 @@
+import time
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Histogram buckets in seconds, from a cached vector search up to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Recent samples kept per series for percentile summaries
+SAMPLE_WINDOW = 2048
+
+HELP = {
+    "rag_stage_seconds": "Time spent in each RAG pipeline stage",
+    "rag_requests_total": "Traced pipeline requests",
+    "rag_tokens_total": "Tokens by pipeline and kind (context_input, context, context_saved, prompt, completion)",
+    "rag_cache_events_total": "Cache lookups by cache and result",
+    "rag_llm_retries_total": "LLM calls retried after an error",
+    "rag_query_batches_total": "Coalesced query batches run by QueryBatcher",
+    "rag_batched_queries_total": "Queries answered through QueryBatcher",
+    "rag_shard_errors_total": "Shard searches that failed and were left out of the merged results",
+}
+
+def _labels(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}"
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store of counters and latency histograms. to_prometheus()
+    renders the Prometheus text exposition format; summary() gives count/mean/p50/p95
+    per stage from a window of recent samples.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                                                "samples": deque(maxlen=SAMPLE_WINDOW)}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += seconds
+            hist["count"] += 1
+            hist["samples"].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            families = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                families[name].append(("counter", labels, value))
+            for (name, labels), hist in self._histograms.items():
+                families[name].append(("histogram", labels, hist))
+            for name in sorted(families):
+                series = families[name]
+                kind = series[0][0]
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for _, labels, value in sorted(series, key=lambda s: s[1]):
+                    if kind == "counter":
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                        continue
+                    for bound, count in zip(self.buckets, value["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name: str = "rag_stage_seconds") -> Dict[str, Dict[str, float]]:
+        """{"pipeline/stage": {"count", "total", "mean", "p50", "p95"}} for one histogram family."""
+        out = {}
+        with self._lock:
+            for (hist_name, labels), hist in self._histograms.items():
+                if hist_name != name:
+                    continue
+                label_map = dict(labels)
+                samples = sorted(hist["samples"])
+                key = "/".join(label_map[k] for k in ("pipeline", "stage") if k in label_map) or hist_name
+                out[key] = {
+                    "count": hist["count"],
+                    "total": hist["sum"],
+                    "mean": hist["sum"] / hist["count"],
+                    "p50": samples[int(0.5 * (len(samples) - 1))],
+                    "p95": samples[int(0.95 * (len(samples) - 1))],
+                }
+        return out
+
+    def write_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+REGISTRY = MetricsRegistry()
+
+class Trace:
+    """
+    Stage timings, token counts and cache results for one request. Everything recorded here
+    is also fed to the registry, labelled with the trace's pipeline name.
+    """
+
+    def __init__(self, pipeline: str, registry: MetricsRegistry = REGISTRY):
+        self.pipeline = pipeline
+        self.registry = registry
+        self.stages = defaultdict(float)
+        self.tokens = defaultdict(int)
+        self.cache = defaultdict(int)
+        self.started = time.perf_counter()
+        self.total = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] += seconds
+        self.registry.observe("rag_stage_seconds", seconds, pipeline=self.pipeline, stage=name)
+
+    def add_tokens(self, kind: str, count: int):
+        self.tokens[kind] += count
+        self.registry.inc("rag_tokens_total", count, pipeline=self.pipeline, kind=kind)
+
+    def cache_result(self, cache: str, hit: bool, count: int = 1):
+        self.cache[f"{cache}_{'hits' if hit else 'misses'}"] += count
+        self.registry.inc("rag_cache_events_total", count, cache=cache, result="hit" if hit else "miss")
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.registry.observe("rag_stage_seconds", self.total, pipeline=self.pipeline, stage="total")
+        self.registry.inc("rag_requests_total", pipeline=self.pipeline)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"pipeline": self.pipeline, "stages": dict(self.stages), "tokens": dict(self.tokens),
+                "cache": dict(self.cache), "total": self.total}
+
+_current = contextvars.ContextVar("rag_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+@contextmanager
+def start_trace(pipeline: str, registry: MetricsRegistry = REGISTRY) -> Iterator[Trace]:
+    """
+    Make a trace current for the block. Inside an active trace the existing one is reused,
+    so search_and_summarize -> query -> search_batch all record into the outermost request.
+    """
+    active = _current.get()
+    if active is not None:
+        yield active
+        return
+    trace = Trace(pipeline, registry)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        trace.finish()
+
+@contextmanager
+def activate(trace: Trace) -> Iterator[Trace]:
+    """
+    Make an existing trace current without finishing it on exit. Generators use this around
+    the code between yields, since a context variable set across a yield leaks to the caller.
+    """
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage into the current trace, or straight into the registry (pipeline "direct")."""
+    trace = _current.get()
+    if trace is not None:
+        with trace.stage(name):
+            yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("rag_stage_seconds", time.perf_counter() - start, pipeline="direct", stage=name)
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    if count <= 0:
+        return
+    trace = _current.get()
+    if trace is not None:
+        trace.cache_result(cache, hit, count)
+    else:
+        REGISTRY.inc("rag_cache_events_total", count, cache=cache, result="hit" if hit else "miss")
+
+def record_tokens(kind: str, count: int):
+    """Add to the current trace's token counts; outside a trace only the registry counter moves."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_tokens(kind, count)
+    else:
+        REGISTRY.inc("rag_tokens_total", count, pipeline="direct", kind=kind)
+
+def record_context(stats: Dict[str, int]):
+    """Token counts from a context.pack_context() stats dict."""
+    record_tokens("context_input", stats["input_tokens"])
+    record_tokens("context", stats["packed_tokens"])
+    record_tokens("context_saved", stats["tokens_saved"])
+
+def format_breakdown(summary: Dict[str, Dict[str, float]]) -> str:
+    """Plain-text table of a summary() result, slowest stages first."""
+    rows = sorted(summary.items(), key=lambda item: -item[1]["total"])
+    lines = [f"{'stage':<40} {'count':>6} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'total s':>9}"]
+    for key, s in rows:
+        lines.append(f"{key:<40} {s['count']:>6} {s['mean'] * 1000:>10.2f} {s['p50'] * 1000:>10.2f} "
+                     f"{s['p95'] * 1000:>10.2f} {s['total']:>9.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Process-wide cache of embedding models, keyed by model name (and backend). Every component
+# (EmbeddingPipeline, FaissVectorStore, RAGSearch, ComplianceChecker) goes through
+# get_embedding_model() so a process holds at most one copy of each model.
+_models: Dict[str, Any] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in MB (0.0 if it cannot be measured)."""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+# CPU inference backends for the embedding model:
+#   torch - the reference SentenceTransformer (PyTorch, float32)
+#   onnx  - the same model exported to ONNX Runtime (sentence-transformers>=3.2, optimum[onnxruntime])
+#   int8  - PyTorch with the Linear layers dynamically quantized to int8
+EMBEDDING_BACKENDS = ("torch", "onnx", "int8")
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """backend, or the EMBEDDING_BACKEND environment variable, defaulting to torch."""
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
+
+
+def embedding_key(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Name under which a model's vectors are cached. Backends other than torch produce
+    slightly different vectors, so they get their own entries in the embedding caches.
+    """
+    backend = resolve_backend(backend)
+    return model_name if backend == "torch" else f"{model_name}#{backend}"
+
+
+def _load_model(model_name: str, backend: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx":
+        try:
+            # Exports the model to ONNX on first use; runs on ONNX Runtime's CPU provider
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        except TypeError as e:
+            raise RuntimeError("The onnx embedding backend needs sentence-transformers>=3.2 "
+                               "and optimum[onnxruntime]") from e
+    if backend == "int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        # Weights of every Linear layer stored as int8; activations are quantized per batch
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return SentenceTransformer(model_name)
+
+
+def get_embedding_model(model_name: str = "all-MiniLM-L6-v2", backend: Optional[str] = None) -> Any:
+    """
+    Return the shared SentenceTransformer for model_name on the given backend (see
+    resolve_backend()), loading it on first use. Load time and the RSS growth caused by
+    the load are recorded in model_stats().
+    """
+    key = embedding_key(model_name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        model = _load_model(model_name, resolve_backend(backend))
+        load_seconds = time.perf_counter() - start
+        rss_after = current_rss_mb()
+        _stats[key] = {
+            "load_seconds": load_seconds,
+            "rss_delta_mb": rss_after - rss_before,
+            "rss_mb": rss_after,
+        }
+        _models[key] = model
+        print(f"[INFO] Loaded embedding model: {key} in {load_seconds:.2f}s "
+              f"(RSS +{rss_after - rss_before:.1f} MB, now {rss_after:.1f} MB)")
+    return model
+
+
+def preload_embedding_model(model_name: str = "all-MiniLM-L6-v2", backend: Optional[str] = None) -> threading.Thread:
+    """
+    Load model_name on a daemon thread, so a fast-starting app can show its UI while the
+    model loads; a query arriving first simply waits on the registry lock.
+    """
+    thread = threading.Thread(target=get_embedding_model, args=(model_name, backend), name=f"preload-{model_name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def model_stats() -> Dict[str, Dict[str, float]]:
+    """Load time and memory figures for every model loaded in this process."""
+    return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def release_models():
+    """Drop all cached models so the next get_embedding_model() call reloads them."""
+    with _lock:
+        _models.clear()
+        _stats.clear()
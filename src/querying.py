@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src import metrics
+from src.model_registry import get_embedding_model
+
+class QueryMixin:
+    """
+    Text-query interface shared by FaissVectorStore and ShardedVectorStore: query embedding
+    through the query cache, query()/query_batch() and optional query batching. The class
+    provides embedding_model, embedding_backend, query_cache, batcher and search_batch(),
+    and names what is searched in _query_target for the logs.
+    """
+    _query_target = "vector store"
+
+    @property
+    def model(self):
+        return get_embedding_model(self.embedding_model, self.embedding_backend)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, filter: Optional[Dict[str, Any]] = None):
+        return self.search_batch(query_embedding, top_k=top_k, filter=filter)[0]
+
+    def embed_queries(self, query_texts: List[str]) -> np.ndarray:
+        """Embed queries, encoding only those missing from the query cache (in one batch)."""
+        with metrics.stage("query_cache"):
+            vectors = self.query_cache.get_many(query_texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        metrics.record_cache("query_embedding", True, len(vectors) - len(missing))
+        metrics.record_cache("query_embedding", False, len(missing))
+        if missing:
+            with metrics.stage("query_encode"):
+                encoded = np.asarray(self.model.encode([query_texts[i] for i in missing]), dtype='float32')
+            self.query_cache.put_many([query_texts[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.vstack(vectors).astype('float32')
+
+    def query_batch(self, query_texts: List[str], top_k: int = 5,
+                    filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Encode all queries in one batched forward pass and search them together (under one filter)."""
+        if not query_texts:
+            return []
+        print(f"[INFO] Querying {self._query_target} for {len(query_texts)} queries")
+        with metrics.start_trace("vectorstore_query"):
+            query_embs = self.embed_queries(list(query_texts))
+            return self.search_batch(query_embs, top_k=top_k, filter=filter)
+
+    def query(self, query_text: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None):
+        print(f"[INFO] Querying {self._query_target} for: '{query_text}'")
+        with metrics.start_trace("vectorstore_query"):
+            if self.batcher is not None:
+                return self.batcher.query(query_text, top_k=top_k, filter=filter)
+            query_emb = self.embed_queries([query_text])
+            return self.search(query_emb, top_k=top_k, filter=filter)
+
+    def enable_batching(self, max_wait_ms: float = 5.0, max_batch: int = 32):
+        """
+        Route query() through a QueryBatcher, so queries arriving together from many threads
+        share one encode and one search. Worth it only under concurrent load: a lone
+        query pays up to max_wait_ms extra.
+        """
+        from src.batching import QueryBatcher
+        self.disable_batching()
+        self.batcher = QueryBatcher(self, max_wait_ms=max_wait_ms, max_batch=max_batch)
+        print(f"[INFO] Query batching enabled (max wait {max_wait_ms} ms, max batch {max_batch})")
+
+    def disable_batching(self):
+        if self.batcher is not None:
+            batcher, self.batcher = self.batcher, None
+            batcher.close()
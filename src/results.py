@@ -0,0 +1,72 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+@dataclass
+class RetrievedChunk:
+    """One search hit: the chunk's faiss id, squared L2 distance, text and loader metadata."""
+    id: int
+    distance: float
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def score(self) -> float:
+        # Similarity as shown in the UIs; only meaningful for normalized embeddings
+        return 1 - self.distance
+
+    @classmethod
+    def from_search_result(cls, result: Dict[str, Any]) -> "RetrievedChunk":
+        meta = dict(result.get("metadata") or {})
+        return cls(id=int(result["index"]), distance=float(result["distance"]), text=meta.pop("text", ""), metadata=meta)
+
+@dataclass
+class AnswerResult:
+    """
+    Everything one question produced: the answer, the chunks retrieved for it (most relevant
+    first), which of them made it into the packed context, timings and the metrics trace.
+    Streaming results carry a token iterator instead of an answer; consume it with stream(),
+    which fills in answer (and timings["time_to_first_token"]/["total"]) as it goes.
+    """
+    query: str
+    answer: Optional[str] = None
+    chunks: List[RetrievedChunk] = field(default_factory=list)
+    context_ids: List[int] = field(default_factory=list)
+    context_stats: Optional[Dict[str, int]] = None
+    cached: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+    trace: Any = None
+    tokens: Optional[Iterator[str]] = None
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def found(self) -> bool:
+        """Whether any retrieved text reached the LLM context."""
+        return bool(self.context_ids)
+
+    @property
+    def context_chunks(self) -> List[RetrievedChunk]:
+        ids = set(self.context_ids)
+        return [c for c in self.chunks if c.id in ids]
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self):
+        """Record the final timings and close the trace (if any)."""
+        self.timings.setdefault("time_to_first_token", self.elapsed())
+        self.timings["total"] = self.elapsed()
+        if self.trace is not None:
+            self.trace.finish()
+
+    def stream(self) -> Iterator[str]:
+        if self.tokens is None:
+            if self.answer:
+                yield self.answer
+            return
+        tokens, self.tokens = self.tokens, None
+        parts = []
+        for token in tokens:
+            parts.append(token)
+            yield token
+        self.answer = "".join(parts)
@@ -1,43 +1,16 @@
-import os
+from typing import Any, Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 from src.vectorstore import FaissVectorStore
-import google.generativeai as genai
+from src.answer_cache import AnswerCache
+from src.answering import AnswerMixin
+from src.llm import LLMBackend, get_llm_backend
+from src.context import DEFAULT_TOKEN_BUDGET
+from src import metrics
+from src.results import AnswerResult
 
 load_dotenv()
 
-class RAGSearch:
-    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", llm_model: str = "gemma2-9b-it"):
-        self.vectorstore = FaissVectorStore(persist_dir, embedding_model)
-        # Load or build vectorstore
-        faiss_path = os.path.join(persist_dir, "faiss.index")
-        meta_path = os.path.join(persist_dir, "metadata.pkl")
-        if not (os.path.exists(faiss_path) and os.path.exists(meta_path)):
-            from src.data_loader import load_all_documents
-            docs = load_all_documents("data")
-            self.vectorstore.build_from_documents(docs)
-        else:
-            self.vectorstore.load()
-        
-        # Initialize Gemini
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        if not google_api_key:
-            print("[WARNING] GOOGLE_API_KEY not found in environment variables.")
-        else:
-            genai.configure(api_key=google_api_key)
-        
-        self.model_name = "gemini-2.0-flash"
-        self.model = genai.GenerativeModel(self.model_name)
-        print(f"[INFO] Gemini LLM initialized: {self.model_name}")
-
-    def search_and_summarize(self, query: str, top_k: int = 5) -> str:
-        results = self.vectorstore.query(query, top_k=top_k)
-        texts = [r["metadata"].get("text", "") for r in results if r["metadata"]]
-        context = "\n\n".join(texts)
-        
-        if not context:
-            return "No relevant documents found."
-            
-        prompt = f"""You are a helpful and safe medical assistant. Use the following context to answer the user's question.
+PROMPT_TEMPLATE = """You are a helpful and safe medical assistant. Use the following context to answer the user's question.
 If the answer is not in the context, say you don't know. Do not make up medical information.
 Always advise the user to consult a doctor for professional advice.
 
@@ -47,11 +20,93 @@ Context:
 Question: {query}
 
 Answer:"""
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error generating response: {e}"
+
+NO_RESULTS_ANSWER = "No relevant documents found."
+
+class RAGSearch(AnswerMixin):
+    prompt_template = PROMPT_TEMPLATE
+    no_context_answer = NO_RESULTS_ANSWER
+    # The UIs show an LLM failure as the answer rather than an exception
+    llm_errors_as_answer = True
+
+    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", llm_model: str = "gemma2-9b-it",
+                 data_dir: str = "data", refresh_index: bool = True,
+                 index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None,
+                 answer_cache: Optional[AnswerCache] = None, llm: Optional[LLMBackend] = None,
+                 read_only: bool = False, context_token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                 shards: Optional[List[str]] = None):
+        if shards:
+            # Scatter-gather over shards built with shard_server.py (directories or shard URLs);
+            # they are built and refreshed on their own, so data_dir is not read here
+            from src.sharding import ShardedVectorStore
+            self.vectorstore = ShardedVectorStore(shards, embedding_model)
+            read_only = True
+        else:
+            # read_only memory-maps an index built elsewhere (e.g. for several serving workers) and never refreshes it
+            self.vectorstore = FaissVectorStore(persist_dir, embedding_model, index_type=index_type, index_params=index_params,
+                                                read_only=read_only)
+        # Load the vectorstore, then embed only what changed in data_dir since the last build.
+        # refresh_index=False starts from the existing index without hashing or parsing data_dir
+        if self.vectorstore.exists():
+            self.vectorstore.load()
+        if not read_only and (refresh_index or not self.vectorstore.exists()):
+            from src.data_loader import list_supported_files
+            files = list_supported_files(data_dir)
+            if files:
+                self.vectorstore.refresh(files)
+            elif not self.vectorstore.exists():
+                raise ValueError(f"No documents found in {data_dir} to build vector store.")
+            else:
+                print(f"[WARNING] No source files in {data_dir}; using the existing index as-is.")
+        
+        # Gemini unless another backend is passed in or LLM_BACKEND selects one (e.g. "stub")
+        self.llm = llm or get_llm_backend(model_name="gemini-2.0-flash", require_api_key=False)
+        self.model_name = self.llm.model_name
+        self.answer_cache = answer_cache or AnswerCache()
+        # Retrieved chunks are merged, deduplicated and trimmed to this many tokens before prompting
+        self.context_token_budget = context_token_budget
+
+    def answer(self, query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None, stream: bool = False,
+               timings: Optional[Dict[str, float]] = None) -> AnswerResult:
+        """
+        Answer query from one embedding and one search. The result carries the retrieved chunks
+        (with scores), the packed context ids and stats, timings ("retrieval",
+        "time_to_first_token", "total") and the metrics trace, so callers never need to query
+        the vector store again. With stream=True the LLM call starts when result.stream() is
+        iterated, and answer and timings are complete once it is exhausted.
+        """
+        return self._answer(query, top_k, filter, stream, timings, "rag_stream" if stream else "rag_search")
+
+    def search_and_summarize(self, query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> str:
+        return self.answer(query, top_k=top_k, filter=filter).answer
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Retrieve context for all queries with one encode and one index search."""
+        return self.vectorstore.query_batch(queries, top_k=top_k)
+
+    def search_and_summarize_batch(self, queries: List[str], top_k: int = 5) -> List[str]:
+        batch = self.retrieve_batch(queries, top_k=top_k)
+        return [self.summarize(query, results) for query, results in zip(queries, batch)]
+
+    def summarize(self, query: str, results: List[Dict[str, Any]]) -> str:
+        """Answer from search results retrieved elsewhere (e.g. by retrieve_batch)."""
+        with metrics.start_trace("rag_summarize") as trace:
+            self.last_trace = trace
+            result = AnswerResult(query=query)
+            prompt, cache_args = self._prepare(query, results, result, trace)
+            return result.answer if prompt is None else self._generate(prompt, cache_args, trace)
+
+    def stream_search_and_summarize(self, query: str, top_k: int = 5, timings: Optional[Dict[str, float]] = None,
+                                    filter: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Like search_and_summarize, but yields the answer text as the LLM produces it.
+        If a timings dict is given it is filled with "retrieval", "time_to_first_token"
+        and "total" (seconds since the call started); the same figures are kept in
+        self.last_stream_timings. Use answer(..., stream=True) to also get the chunks.
+        """
+        result = self.answer(query, top_k=top_k, filter=filter, stream=True, timings=timings)
+        self.last_stream_timings = result.timings
+        yield from result.stream()
 
 # Example usage
 if __name__ == "__main__":
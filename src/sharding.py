@@ -0,0 +1,259 @@
+import os
+import glob
+import json
+import hashlib
+import threading
+import multiprocessing
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+from src import metrics
+from src.embedding_cache import QueryEmbeddingCache, DEFAULT_QUERY_CACHE_PATH
+from src.model_registry import embedding_key, resolve_backend
+from src.querying import QueryMixin
+
+DEFAULT_SHARD_TIMEOUT = 10.0
+
+def shard_dir(root: str, shard: int) -> str:
+    return os.path.join(root, f"shard-{shard}")
+
+def build_shard(root: str, shard: int, num_shards: int, data_dir: str = "data", **store_kwargs) -> Dict[str, int]:
+    """
+    Build or refresh one shard under root from every file in data_dir. Each shard reads all
+    files but embeds only the chunks it owns, so shards can be built on different machines
+    (with the same data) without coordinating.
+    """
+    from src.vectorstore import FaissVectorStore
+    from src.data_loader import list_supported_files
+    files = list_supported_files(data_dir)
+    if not files:
+        raise ValueError(f"No documents found in {data_dir} to build shard {shard}.")
+    store = FaissVectorStore(shard_dir(root, shard), shard=(shard, num_shards), **store_kwargs)
+    if store.exists():
+        store.load()
+    return store.refresh(files)
+
+def hits_json(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """search_batch() hits with plain int/float values, for JSON replies."""
+    return [{"index": int(h["index"]), "distance": float(h["distance"]), "metadata": h["metadata"]} for h in hits]
+
+def describe_shard(store) -> Dict[str, Any]:
+    """Layout and size of a loaded shard store, as returned by LocalShard/RemoteShard.info()."""
+    return {
+        "persist_dir": store.persist_dir,
+        "shard": store.manifest.get("shard"),
+        "ntotal": int(store.index.ntotal) if store.index is not None else 0,
+        "index_version": store.index_version,
+        "embedding_model": store.manifest.get("embedding_model"),
+        "pid": os.getpid(),
+    }
+
+def _local_shard_worker(persist_dir: str, conn):
+    """Serve search_batch requests for one read-only shard over a pipe until told to stop."""
+    from src.vectorstore import FaissVectorStore
+    try:
+        store = FaissVectorStore(persist_dir, read_only=True, query_cache_path=None)
+        if not store.exists():
+            raise FileNotFoundError(f"No shard built in {persist_dir}")
+        store.load()
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ok", describe_shard(store)))
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            op, args = request
+            if op == "search":
+                conn.send(("ok", [hits_json(hits) for hits in store.search_batch(*args)]))
+            else:
+                conn.send(("ok", describe_shard(store)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+class LocalShard:
+    """A shard served by a child process on this machine, which memory-maps its index."""
+
+    def __init__(self, persist_dir: str):
+        self.name = persist_dir
+        self._lock = threading.Lock()
+        self._conn, child = multiprocessing.get_context("spawn").Pipe()
+        # spawn, not fork: the child must not inherit the coordinator's model or thread pools
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_local_shard_worker, args=(persist_dir, child), name=f"shard-{os.path.basename(persist_dir)}", daemon=True)
+        self._process.start()
+        child.close()
+        status, payload = self._conn.recv()
+        if status != "ok":
+            self._process.join()
+            raise RuntimeError(f"Shard {persist_dir} failed to start: {payload}")
+        self._info = payload
+
+    def _call(self, op: str, args=None):
+        # One pipe per shard: requests from concurrent queries take turns
+        with self._lock:
+            self._conn.send((op, args))
+            status, payload = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Shard {self.name}: {payload}")
+        return payload
+
+    def info(self) -> Dict[str, Any]:
+        self._info = self._call("info")
+        return self._info
+
+    def search_batch(self, vectors: np.ndarray, top_k: int, filter: Optional[Dict[str, Any]] = None):
+        return self._call("search", (vectors, top_k, filter))
+
+    def close(self):
+        if self._process.is_alive():
+            with self._lock:
+                self._conn.send(None)
+            self._process.join(timeout=5)
+        self._conn.close()
+
+class RemoteShard:
+    """A shard served over HTTP by `shard_server.py serve` on another host (or port)."""
+
+    def __init__(self, url: str, timeout: float = DEFAULT_SHARD_TIMEOUT):
+        self.name = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path: str, body: Optional[Dict[str, Any]] = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.name + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Shard {self.name}: HTTP {e.code} {e.read().decode('utf-8', 'replace')}") from e
+
+    def info(self) -> Dict[str, Any]:
+        return self._request("/shard/info")
+
+    def search_batch(self, vectors: np.ndarray, top_k: int, filter: Optional[Dict[str, Any]] = None):
+        body = {"vectors": np.asarray(vectors, dtype='float32').tolist(), "top_k": top_k, "filter": filter}
+        return self._request("/shard/search", body)["results"]
+
+    def close(self):
+        pass
+
+def open_shards(specs: Sequence[str]) -> List[Union[LocalShard, RemoteShard]]:
+    """
+    Shards from a list of URLs (remote shards), shard directories, or a root directory
+    holding shard-0, shard-1, ... (each started as a local process).
+    """
+    shards = []
+    for spec in specs:
+        if spec.startswith(("http://", "https://")):
+            shards.append(RemoteShard(spec))
+            continue
+        subdirs = sorted(glob.glob(os.path.join(spec, "shard-*")), key=lambda d: int(d.rsplit("-", 1)[-1]))
+        for path in subdirs or [spec]:
+            shards.append(LocalShard(path))
+    return shards
+
+class ShardedVectorStore(QueryMixin):
+    """
+    Scatter-gather coordinator over shards built with build_shard(). A query is embedded
+    once here, its vector is sent to every shard in parallel, and the per-shard top-k lists
+    are merged by distance. Offers the query interface RAGSearch and QueryBatcher use
+    (query, query_batch, embed_queries, search_batch, index_version), so it can stand in for
+    a FaissVectorStore. A shard that fails is skipped with a warning unless
+    allow_partial=False; the query fails only when every shard does.
+    """
+
+    def __init__(self, shards: Sequence[Union[str, LocalShard, RemoteShard]], embedding_model: str = "all-MiniLM-L6-v2",
+                 embedding_backend: Optional[str] = None, query_cache_path: Optional[str] = DEFAULT_QUERY_CACHE_PATH,
+                 query_cache_size: int = 1024, allow_partial: bool = True):
+        specs = [s for s in shards if isinstance(s, str)]
+        self.shards = [s for s in shards if not isinstance(s, str)] + (open_shards(specs) if specs else [])
+        if not self.shards:
+            raise ValueError("ShardedVectorStore needs at least one shard.")
+        self.embedding_model = embedding_model
+        self.embedding_backend = resolve_backend(embedding_backend)
+        self.query_cache = QueryEmbeddingCache(embedding_key(embedding_model, self.embedding_backend), query_cache_path, query_cache_size)
+        self.allow_partial = allow_partial
+        self.read_only = True
+        self.batcher = None
+        self.shard_info: List[Dict[str, Any]] = []
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard-search")
+
+    @property
+    def _query_target(self) -> str:
+        return f"{len(self.shards)} shards"
+
+    @property
+    def index_version(self) -> Optional[str]:
+        """
+        Combined version of the indexes the shards are serving, re-read from every shard
+        (over its pipe or /shard/info) on each call, so cached answers expire as soon as a
+        shard serves a rebuilt index. A shard that does not answer keeps its last known
+        version. None before load().
+        """
+        if not self.shard_info:
+            return None
+        futures = [self._pool.submit(shard.info) for shard in self.shards]
+        for i, (shard, future) in enumerate(zip(self.shards, futures)):
+            try:
+                self.shard_info[i] = future.result()
+            except Exception as e:
+                print(f"[WARNING] Could not read the index version of shard {shard.name}: {e}")
+        versions = [info.get("index_version") or "" for info in self.shard_info]
+        return hashlib.sha1("|".join(versions).encode("utf-8")).hexdigest()
+
+    def exists(self) -> bool:
+        return True
+
+    def load(self):
+        """Ask every shard for its layout and check that together they cover 0..N-1 exactly once."""
+        self.shard_info = [shard.info() for shard in self.shards]
+        layouts = [tuple(info["shard"]) if info.get("shard") else None for info in self.shard_info]
+        counts = {layout[1] for layout in layouts if layout}
+        if None in layouts or len(counts) != 1 or sorted(l[0] for l in layouts) != list(range(counts.pop())):
+            print(f"[WARNING] Shards do not form one complete layout: {layouts}")
+        models = {info.get("embedding_model") for info in self.shard_info}
+        if models - {self.embedding_model}:
+            print(f"[WARNING] Shards were built with {models}, queries use {self.embedding_model}")
+        total = sum(info["ntotal"] for info in self.shard_info)
+        print(f"[INFO] Connected to {len(self.shards)} shards with {total} vectors: "
+              + ", ".join(f"{shard.name} ({info['ntotal']})" for shard, info in zip(self.shards, self.shard_info)))
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = 5,
+                     filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search every shard in parallel and merge the per-query results by distance."""
+        queries = np.ascontiguousarray(query_embeddings, dtype='float32')
+        with metrics.stage("shard_search"):
+            futures = [self._pool.submit(shard.search_batch, queries, top_k, filter) for shard in self.shards]
+            replies = []
+            for shard, future in zip(self.shards, futures):
+                try:
+                    replies.append(future.result())
+                except Exception as e:
+                    metrics.REGISTRY.inc("rag_shard_errors_total", shard=shard.name)
+                    if not self.allow_partial:
+                        raise
+                    print(f"[WARNING] Shard {shard.name} failed; answering without it: {e}")
+        if not replies:
+            raise RuntimeError("Every shard failed to answer the query.")
+        with metrics.stage("shard_merge"):
+            merged = []
+            for i in range(len(queries)):
+                hits = [hit for reply in replies for hit in reply[i]]
+                hits.sort(key=lambda hit: hit["distance"])
+                merged.append(hits[:top_k])
+        return merged
+
+    def close(self):
+        """Stop the batcher and the local shard processes."""
+        self.disable_batching()
+        self._pool.shutdown()
+        for shard in self.shards:
+            shard.close()
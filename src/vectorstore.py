@@ -1,70 +1,543 @@
 import os
+import json
+import time
+import hashlib
+import uuid
 import faiss
 import numpy as np
 import pickle
-from typing import List, Any
-from sentence_transformers import SentenceTransformer
+from typing import List, Any, Dict, Iterable, Optional, Tuple
 from src.embedding import EmbeddingPipeline
+from src import index_factory
+from src.embedding_cache import QueryEmbeddingCache, DEFAULT_QUERY_CACHE_PATH, DEFAULT_CHUNK_CACHE_DIR
+from src.chunk_store import ChunkStore
+from src.model_registry import current_rss_mb, embedding_key, resolve_backend
+from src.querying import QueryMixin
+from src import metrics
 
-class FaissVectorStore:
-    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", chunk_size: int = 1000, chunk_overlap: int = 200):
+# Version 2 stores source/page/row and other loader metadata with each chunk; older stores
+# are rebuilt on refresh so their chunks gain it
+MANIFEST_VERSION = 2
+# Filters matching at most this many chunks are scored directly on their reconstructed
+# vectors (uncompressed indexes only); larger subsets are searched through the index with
+# an ID selector
+FILTER_BRUTE_FORCE_MAX = 4096
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def shard_of(chunk_hash: str, num_shards: int) -> int:
+    """Shard that owns a chunk, from the sha1 of its text; the same on every machine and run."""
+    return int(chunk_hash[:8], 16) % num_shards
+
+def _chunk_metadata(chunk: Any, path: Optional[str] = None) -> Dict[str, Any]:
+    """Loader metadata (page, row, ...) plus the text; chunks of a file record it as source and doc_type."""
+    meta = dict(chunk.metadata)
+    if path is not None:
+        # CSV rows use the transcription as their loader "source"; the file is what callers filter on
+        meta["source"] = path
+        meta["doc_type"] = os.path.splitext(path)[1].lower().lstrip(".")
+    meta["text"] = chunk.page_content
+    return meta
+
+class FaissVectorStore(QueryMixin):
+    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", chunk_size: int = 1000, chunk_overlap: int = 200,
+                 index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None,
+                 query_cache_path: Optional[str] = DEFAULT_QUERY_CACHE_PATH, query_cache_size: int = 1024,
+                 read_only: bool = False, batch_size: int = 512, checkpoint_every: int = 10000,
+                 chunk_cache_dir: Optional[str] = DEFAULT_CHUNK_CACHE_DIR, embedding_backend: Optional[str] = None,
+                 encode_processes: int = 1, shard: Optional[Tuple[int, int]] = None, load_workers: Optional[int] = None):
         self.persist_dir = persist_dir
-        os.makedirs(self.persist_dir, exist_ok=True)
+        # Read-only stores memory-map faiss.index and chunks.sqlite so that worker processes
+        # on one host share the page cache instead of each holding a private copy
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(self.persist_dir, exist_ok=True)
         self.index = None
-        self.metadata = []
+        # See src/index_factory.py for the supported index types and their parameters
+        self.index_config = index_factory.resolve_config(index_type, index_params)
+        # What the caller asked for; load() serves the index on disk as stored and the next
+        # refresh rebuilds it if the two differ
+        self._requested_config = self.index_config
+        self._stored_signature = None
+        # (embeddings, ids) batches held back until there are enough vectors to train the index
+        self._pending = []
+        # Chunk text/metadata live on disk keyed by the int64 ids stored in the faiss index
+        self.chunks = ChunkStore(os.path.join(self.persist_dir, "chunks.sqlite"), read_only=read_only)
         self.embedding_model = embedding_model
-        self.model = SentenceTransformer(embedding_model)
+        # CPU inference backend for chunks and queries (torch, onnx or int8; None reads EMBEDDING_BACKEND).
+        # Switching backends does not rebuild the index: their vectors stay within a small cosine
+        # distance of the torch model (checked by embedding_benchmark.py)
+        self.embedding_backend = resolve_backend(embedding_backend)
+        # Builds and refreshes encode on this many worker processes
+        self.encode_processes = encode_processes
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        print(f"[INFO] Loaded embedding model: {embedding_model}")
-
-    def build_from_documents(self, documents: List[Any]):
-        print(f"[INFO] Building vector store from {len(documents)} raw documents...")
-        emb_pipe = EmbeddingPipeline(model_name=self.embedding_model, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
-        chunks = emb_pipe.chunk_documents(documents)
-        embeddings = emb_pipe.embed_chunks(chunks)
-        metadatas = [{"text": chunk.page_content} for chunk in chunks]
-        self.add_embeddings(np.array(embeddings).astype('float32'), metadatas)
+        # (shard index, shard count): keep only the chunks shard_of() assigns to this shard and
+        # number them index, index + count, ... so ids are unique across shards (src/sharding.py)
+        self.shard = tuple(shard) if shard else None
+        # Ingestion embeds and indexes batch_size chunks at a time and saves a checkpoint
+        # after every checkpoint_every newly embedded chunks
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        # When a refresh finds several changed files, up to load_workers of them (None: one
+        # per CPU) are parsed ahead in a process pool while the current one is embedded
+        self.load_workers = load_workers
+        self.chunk_cache_dir = chunk_cache_dir
+        self.manifest = self._empty_manifest()
+        self.query_cache = QueryEmbeddingCache(embedding_key(embedding_model, self.embedding_backend), query_cache_path, query_cache_size)
+        # Set by enable_batching(): concurrent query() calls are then coalesced (src/batching.py)
+        self.batcher = None
+
+    @property
+    def index_version(self) -> Optional[str]:
+        """Changes every time the index is saved, so caches of answers built on it can expire."""
+        return self.manifest.get("index_version")
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        # files: path -> {"hash": file sha256, "chunks": [[chunk sha1, chunk id], ...]}
+        return {
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "shard": list(self.shard) if self.shard else None,
+            "next_id": self.shard[0] if self.shard else 0,
+            "files": {},
+        }
+
+    def _paths(self):
+        return (os.path.join(self.persist_dir, "faiss.index"),
+                os.path.join(self.persist_dir, "manifest.json"),
+                # Written by older versions; migrated into chunks.sqlite on load()
+                os.path.join(self.persist_dir, "metadata.pkl"))
+
+    def exists(self) -> bool:
+        faiss_path, manifest_path, legacy_meta_path = self._paths()
+        return os.path.exists(faiss_path) and (os.path.exists(manifest_path) or os.path.exists(legacy_meta_path))
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"Vector store {self.persist_dir} was opened read-only.")
+
+    def reset(self):
+        self._check_writable()
+        self.index = None
+        self.index_config = self._requested_config
+        self._pending = []
+        self._stored_signature = None
+        self.chunks.clear()
+        self.manifest = self._empty_manifest()
+
+    def build_from_documents(self, documents: Iterable[Any]):
+        """
+        Rebuild the store from scratch, streaming documents through chunking and embedding
+        batch_size chunks at a time. Chunks added this way are not tracked by file, so a
+        later refresh() replaces them with a full, file-tracked rebuild.
+        """
+        print("[INFO] Building vector store from raw documents...")
+        self.reset()
+        emb_pipe = self._embedding_pipeline()
+        batch = []
+        try:
+            for chunk in emb_pipe.iter_chunks(documents):
+                if self.shard and not self._owns(_hash_text(chunk.page_content)):
+                    continue
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    self.add_embeddings(emb_pipe.embed_batch(batch), [_chunk_metadata(c) for c in batch])
+                    batch = []
+            if batch:
+                self.add_embeddings(emb_pipe.embed_batch(batch), [_chunk_metadata(c) for c in batch])
+        finally:
+            emb_pipe.close()
         self.save()
         print(f"[INFO] Vector store built and saved to {self.persist_dir}")
 
-    def add_embeddings(self, embeddings: np.ndarray, metadatas: List[Any] = None):
-        dim = embeddings.shape[1]
-        if self.index is None:
-            self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+    def _owns(self, chunk_hash: str) -> bool:
+        return self.shard is None or shard_of(chunk_hash, self.shard[1]) == self.shard[0]
+
+    def _embedding_pipeline(self) -> EmbeddingPipeline:
+        return EmbeddingPipeline(model_name=self.embedding_model, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+                                 cache_dir=self.chunk_cache_dir, backend=self.embedding_backend,
+                                 encode_processes=self.encode_processes)
+
+    def _needs_full_rebuild(self) -> bool:
+        if self.index is None or self.index.ntotal == 0:
+            return False
+        if not index_factory.supports_ids(self.index):
+            return True
+        if self._stored_signature != index_factory.build_signature(self._requested_config):
+            return True
+        m = self.manifest
+        if not m.get("files"):
+            return True
+        return (m.get("version") != MANIFEST_VERSION
+                or m.get("embedding_model") != self.embedding_model
+                or m.get("chunk_size") != self.chunk_size
+                or m.get("chunk_overlap") != self.chunk_overlap
+                or m.get("shard") != (list(self.shard) if self.shard else None))
+
+    def refresh(self, file_paths: List[str]) -> Dict[str, int]:
+        """
+        Bring the index in line with file_paths. Unchanged files (same sha256) are skipped,
+        chunks of changed files are matched by content hash so only new text is embedded,
+        and chunks of changed or deleted files that no longer exist are removed. Changed files
+        are parsed ahead in a process pool (load_workers) while earlier ones are embedded, and
+        streamed through _ingest_file(), so an interrupted refresh resumes where its last
+        checkpoint left off.
+        """
+        self._check_writable()
+        if self._needs_full_rebuild():
+            print("[INFO] Existing index is untracked or was built with different settings; rebuilding.")
+            self.reset()
+
+        files = self.manifest["files"]
+        wanted = set()
+        for path in file_paths:
+            if os.path.exists(path):
+                wanted.add(os.path.normpath(path))
+            else:
+                print(f"[WARNING] {path} not found; dropping it from the index.")
+
+        stats = {"added": 0, "removed": 0, "unchanged_files": 0, "changed_files": 0, "deleted_files": 0}
+
+        for path in sorted(set(files) - wanted):
+            stats["removed"] += self.remove_ids([cid for _, cid in files.pop(path)["chunks"]])
+            stats["deleted_files"] += 1
+
+        changed = []
+        for path in sorted(wanted):
+            file_hash = _hash_file(path)
+            entry = files.get(path)
+            if entry and entry["hash"] == file_hash and not entry.get("partial"):
+                stats["unchanged_files"] += 1
+            else:
+                changed.append((path, file_hash, entry))
+
+        from src.data_loader import FilePrefetcher
+        emb_pipe = None
+        partial = False
+        prefetcher = FilePrefetcher([path for path, _, _ in changed], max_workers=self.load_workers)
+        try:
+            for path, file_hash, entry in changed:
+                if emb_pipe is None:
+                    emb_pipe = self._embedding_pipeline()
+                try:
+                    self._ingest_file(path, file_hash, entry, emb_pipe, stats, prefetcher.documents(path))
+                except Exception as e:
+                    print(f"[ERROR] Failed to load {path}: {e}")
+                    # Keep whatever was embedded before the failure; the file stays marked partial
+                    partial = partial or files.get(path) is not entry
+                    continue
+                stats["changed_files"] += 1
+        finally:
+            prefetcher.close()
+        if emb_pipe is not None:
+            emb_pipe.close()
+
+        if stats["changed_files"] or stats["deleted_files"] or partial:
+            self.save()
+        print(f"[INFO] Refreshed vector store: {stats}")
+        if emb_pipe is not None and emb_pipe.cache is not None:
+            print(f"[INFO] Chunk embedding cache: {emb_pipe.cache.stats()}")
+        return stats
+
+    def _ingest_file(self, path: str, file_hash: str, entry: Optional[Dict[str, Any]], emb_pipe: EmbeddingPipeline,
+                     stats: Dict[str, int], documents: Optional[Iterable[Any]] = None):
+        """
+        Stream one file's documents (already parsed, or loaded lazily from path when documents
+        is None) through chunking and embedding, adding batch_size new chunks to the index at
+        a time. stats["added"] and stats["removed"] are updated as batches land, so a file
+        that fails part-way still counts what it left in the index (a failed batch is rolled
+        back and not counted). Until the file is done its manifest entry lists every id of
+        the file in the index and is marked partial, and the store is saved every
+        checkpoint_every new chunks, so a resumed refresh reuses the embedded chunks through
+        the usual content-hash matching.
+        """
+        from src.data_loader import iter_file
+
+        # Old chunk ids by content hash; a list because identical chunks may repeat
+        old_ids = {}
+        for chunk_hash, cid in (entry["chunks"] if entry else []):
+            old_ids.setdefault(chunk_hash, []).append(cid)
+
+        new_entries = []
+        batch = []
+        # Reused chunks get their metadata rewritten too, since page or row may have moved
+        reused = []
+        counts = {"added": 0, "since_checkpoint": 0}
+
+        def flush_reused():
+            if reused:
+                self.chunks.put_many([cid for cid, _ in reused], [meta for _, meta in reused])
+                reused.clear()
+
+        def flush():
+            flush_reused()
+            if not batch:
+                return
+            start = self.manifest["next_id"]
+            try:
+                ids = self.add_embeddings(emb_pipe.embed_batch([chunk for _, chunk in batch]),
+                                          [_chunk_metadata(chunk, path) for _, chunk in batch])
+            except Exception:
+                # The batch is not in the manifest yet; take back any of its ids that reached the
+                # index or chunk store so a failed add can't leave untracked vectors behind
+                step = self.shard[1] if self.shard else 1
+                self.remove_ids(list(range(start, self.manifest["next_id"], step)))
+                raise
+            for (position, _), cid in zip(batch, ids):
+                new_entries[position][1] = int(cid)
+            counts["added"] += len(batch)
+            counts["since_checkpoint"] += len(batch)
+            stats["added"] += len(batch)
+            batch.clear()
+            remaining = [[chunk_hash, cid] for chunk_hash, ids in old_ids.items() for cid in ids]
+            self.manifest["files"][path] = {"hash": file_hash, "chunks": new_entries + remaining, "partial": True}
+            # An untrained index can't be saved yet; checkpoints start once it exists
+            if counts["since_checkpoint"] >= self.checkpoint_every and self.index is not None:
+                self.save()
+                counts["since_checkpoint"] = 0
+                print(f"[INFO] Checkpointed {path} after {counts['added']} new chunks")
+
+        for chunk in emb_pipe.iter_chunks(iter_file(path) if documents is None else documents):
+            chunk_hash = _hash_text(chunk.page_content)
+            if not self._owns(chunk_hash):
+                continue
+            if old_ids.get(chunk_hash):
+                new_entries.append([chunk_hash, old_ids[chunk_hash].pop()])
+                reused.append((new_entries[-1][1], _chunk_metadata(chunk, path)))
+                if len(reused) >= self.batch_size:
+                    flush_reused()
+            else:
+                new_entries.append([chunk_hash, None])
+                batch.append((len(new_entries) - 1, chunk))
+                if len(batch) >= self.batch_size:
+                    flush()
+        flush()
+
+        stats["removed"] += self.remove_ids([cid for ids in old_ids.values() for cid in ids])
+        self.manifest["files"][path] = {"hash": file_hash, "chunks": new_entries}
+
+    def add_embeddings(self, embeddings: np.ndarray, metadatas: List[Any] = None) -> np.ndarray:
+        self._check_writable()
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        start = self.manifest["next_id"]
+        step = self.shard[1] if self.shard else 1
+        ids = np.arange(start, start + embeddings.shape[0] * step, step, dtype='int64')
+        self.manifest["next_id"] = start + embeddings.shape[0] * step
+        if self.index is not None:
+            self.index.add_with_ids(embeddings, ids)
+        else:
+            self._pending.append((embeddings, ids))
+            self._flush_pending()
         if metadatas:
-            self.metadata.extend(metadatas)
+            self.chunks.put_many(ids, metadatas)
         print(f"[INFO] Added {embeddings.shape[0]} vectors to Faiss index.")
+        return ids
+
+    def _flush_pending(self, force: bool = False):
+        """Create (and train) the index once enough vectors are buffered, or unconditionally if force."""
+        if not self._pending:
+            return
+        pending = sum(emb.shape[0] for emb, _ in self._pending)
+        if pending < index_factory.train_size(self.index_config) and not force:
+            return
+        embeddings = np.vstack([emb for emb, _ in self._pending])
+        ids = np.concatenate([cids for _, cids in self._pending])
+        # Keep the buffered vectors until the index is built, so a failed training loses nothing
+        index = index_factory.create_index(self.index_config, embeddings.shape[1], embeddings.shape[0])
+        index_factory.train_index(index, embeddings, self.index_config)
+        index.add_with_ids(embeddings, ids)
+        self.index = index
+        self._pending = []
+        self._stored_signature = index_factory.build_signature(self.index_config)
+
+    def remove_ids(self, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        self._check_writable()
+        ids = np.asarray(ids, dtype='int64')
+        self.chunks.delete_many(ids)
+        if self._pending:
+            self._pending = [(emb[~np.isin(cids, ids)], cids[~np.isin(cids, ids)]) for emb, cids in self._pending]
+        if self.index is None:
+            return len(ids)
+        try:
+            return int(self.index.remove_ids(ids))
+        except RuntimeError:
+            # HNSW graphs do not support deletion; rebuild from the stored vectors instead
+            return self._rebuild_without(ids)
+
+    def _rebuild_without(self, ids: np.ndarray) -> int:
+        inner = faiss.downcast_index(self.index.index)
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        all_ids = faiss.vector_to_array(self.index.id_map)
+        keep = ~np.isin(all_ids, ids)
+        print(f"[INFO] Rebuilding {self.index_config['index_type']} index without {int((~keep).sum())} removed vectors...")
+        self.index = None
+        self._pending = [(vectors[keep], all_ids[keep])]
+        self._flush_pending(force=True)
+        return int((~keep).sum())
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Retune query-time accuracy/speed; persisted with the index on the next save()."""
+        params = self.index_config["params"]
+        if nprobe is not None:
+            params["nprobe"] = nprobe
+        if ef_search is not None:
+            params["ef_search"] = ef_search
+        if self.index is not None:
+            index_factory.apply_search_params(self.index, self.index_config)
 
     def save(self):
-        faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
+        self._check_writable()
+        faiss_path, _, _ = self._paths()
+        self._flush_pending(force=True)
+        if self.index is None:
+            print(f"[WARNING] Nothing to save in {self.persist_dir}; the vector store is empty.")
+            return
+        self.manifest["index_version"] = uuid.uuid4().hex
         faiss.write_index(self.index, faiss_path)
-        with open(meta_path, "wb") as f:
-            pickle.dump(self.metadata, f)
+        index_factory.save_config(self.persist_dir, self.index_config)
+        self.chunks.commit()
+        self.manifest["chunk_store"] = "sqlite"
+        self._write_manifest()
         print(f"[INFO] Saved Faiss index and metadata to {self.persist_dir}")
 
+    def _write_manifest(self):
+        _, manifest_path, _ = self._paths()
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
     def load(self):
-        faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
-        self.index = faiss.read_index(faiss_path)
+        faiss_path, manifest_path, legacy_meta_path = self._paths()
+        start = time.perf_counter()
+        rss_before = current_rss_mb()
+        stored = index_factory.load_config(self.persist_dir) or index_factory.resolve_config("flat")
+        self.index = self._read_index_mmap(faiss_path, stored) if self.read_only else faiss.read_index(faiss_path)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = self._empty_manifest()
+            self.manifest["next_id"] = self.index.ntotal
+            self.manifest["index_version"] = f"legacy-{self.index.ntotal}"
+        if self.manifest.get("chunk_store") != "sqlite" and os.path.exists(legacy_meta_path):
+            if self.read_only:
+                raise RuntimeError(f"{self.persist_dir} still uses metadata.pkl; load it once without read_only to migrate it.")
+            self._migrate_pickled_metadata(legacy_meta_path)
+            # Persist it now; without a refresh (refresh_index=False) nothing else would save,
+            # and the migration would rerun on every start
+            self._write_manifest()
+        self._pending = []
+        self._stored_signature = index_factory.build_signature(stored)
+        requested = self._requested_config
+        if self._stored_signature != index_factory.build_signature(requested):
+            print(f"[WARNING] The index in {self.persist_dir} ({stored['index_type']}) was built with other settings than "
+                  f"requested ({requested['index_type']}); serving it as stored"
+                  + ("." if self.read_only else " until the next refresh rebuilds it."))
+        # Always search with the config of the index on disk, so search parameters match its type.
+        # Keep the clamped build values from disk but honour the caller's search parameters
+        for key in index_factory.SEARCH_PARAMS:
+            if key in requested["params"] and key in stored["params"]:
+                stored["params"][key] = requested["params"][key]
+        self.index_config = stored
+        index_factory.apply_search_params(self.index, self.index_config)
+        rss_after = current_rss_mb()
+        print(f"[INFO] Loaded Faiss index and metadata from {self.persist_dir} in {time.perf_counter() - start:.2f}s "
+              f"({'mmap, read-only' if self.read_only else 'in-memory'}; RSS +{rss_after - rss_before:.1f} MB, now {rss_after:.1f} MB)")
+
+    @staticmethod
+    def _read_index_mmap(faiss_path: str, config: Dict[str, Any]):
+        # IVF inverted lists and flat code arrays are mapped by different faiss flags,
+        # and combining them fails for IVF; pick the one that matches the index type
+        if config["index_type"] in ("ivf_flat", "ivf_pq"):
+            flag = faiss.IO_FLAG_MMAP
+        else:
+            flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(faiss_path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"[WARNING] Could not memory-map {faiss_path} ({e}); reading it into memory instead.")
+            return faiss.read_index(faiss_path)
+
+    def _migrate_pickled_metadata(self, meta_path: str):
         with open(meta_path, "rb") as f:
-            self.metadata = pickle.load(f)
-        print(f"[INFO] Loaded Faiss index and metadata from {self.persist_dir}")
-
-    def search(self, query_embedding: np.ndarray, top_k: int = 5):
-        D, I = self.index.search(query_embedding, top_k)
-        results = []
-        for idx, dist in zip(I[0], D[0]):
-            meta = self.metadata[idx] if idx < len(self.metadata) else None
-            results.append({"index": idx, "distance": dist, "metadata": meta})
-        return results
-
-    def query(self, query_text: str, top_k: int = 5):
-        print(f"[INFO] Querying vector store for: '{query_text}'")
-        query_emb = self.model.encode([query_text]).astype('float32')
-        return self.search(query_emb, top_k=top_k)
+            metadata = pickle.load(f)
+        # Stores written before the manifest existed keep metadata as a positional list
+        items = enumerate(metadata) if isinstance(metadata, list) else metadata.items()
+        ids, metadatas = zip(*items) if metadata else ((), ())
+        self.chunks.clear()
+        self.chunks.put_many(ids, metadatas)
+        self.chunks.commit()
+        self.manifest["chunk_store"] = "sqlite"
+        print(f"[INFO] Migrated {len(ids)} chunks from {meta_path} into {self.chunks.path}")
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = 5,
+                     filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run one index.search over a (n_queries, dim) matrix; returns one result list per query.
+        With a filter such as {"source": "data/Task2_data.pdf", "page": [3, 4]} only chunks whose
+        metadata matches every key are searched (see ChunkStore.ids_matching).
+        """
+        self._flush_pending(force=True)
+        if self.index is None:
+            return [[] for _ in range(len(query_embeddings))]
+        queries = np.ascontiguousarray(query_embeddings, dtype='float32')
+        with metrics.stage("index_search"):
+            if filter:
+                D, I = self._filtered_search(queries, top_k, filter)
+            else:
+                D, I = self.index.search(queries, top_k)
+        # Only the returned chunks are read from the chunk store, in one lookup
+        with metrics.stage("chunk_lookup"):
+            found = self.chunks.get_many(I[I >= 0])
+        batch = []
+        for ids, dists in zip(I, D):
+            results = []
+            for idx, dist in zip(ids, dists):
+                if idx < 0:
+                    continue
+                meta = found.get(int(idx))
+                results.append({"index": idx, "distance": dist, "metadata": meta})
+            batch.append(results)
+        return batch
+
+    def _filtered_search(self, queries: np.ndarray, top_k: int, filter: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(self.chunks.ids_matching(filter), dtype='int64')
+        D = np.full((len(queries), top_k), np.inf, dtype='float32')
+        I = np.full((len(queries), top_k), -1, dtype='int64')
+        if len(ids) == 0:
+            return D, I
+        # Scoring reconstructed vectors only matches the index's own distances when it stores them
+        # uncompressed; PCA, scalar quantizers and PQ must go through the selector so a filter ranks
+        # and scores the same however many chunks it matches
+        if len(ids) <= FILTER_BRUTE_FORCE_MAX and index_factory.stores_exact_vectors(self.index_config):
+            try:
+                vectors = self.index.reconstruct_batch(ids)
+            except RuntimeError:
+                vectors = None
+            if vectors is not None:
+                # Squared L2 to the stored vectors, as the index reports it
+                dists = (queries ** 2).sum(1)[:, None] + (vectors ** 2).sum(1)[None, :] - 2 * queries @ vectors.T
+                k = min(top_k, len(ids))
+                order = np.argpartition(dists, k - 1, axis=1)[:, :k]
+                order = np.take_along_axis(order, np.argsort(np.take_along_axis(dists, order, axis=1), axis=1), axis=1)
+                D[:, :k] = np.maximum(np.take_along_axis(dists, order, axis=1), 0)
+                I[:, :k] = ids[order]
+                return D, I
+        selector = faiss.IDSelectorBatch(ids)
+        return self.index.search(queries, top_k, params=index_factory.search_parameters(self.index_config, selector))
 
 # Example usage
 if __name__ == "__main__":
@@ -73,4 +546,4 @@ if __name__ == "__main__":
     store = FaissVectorStore("faiss_store")
     store.build_from_documents(docs)
     store.load()
-    print(store.query("What is attention mechanism?", top_k=3))
\ No newline at end of file
+    print(store.query("What is attention mechanism?", top_k=3))
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark. Every measurement runs in a fresh Python process so nothing is
+already imported or cached in memory:
+
+- import time of each app and pipeline module, plus the slowest individual imports
+  reported by `python -X importtime`
+- time to first answer for the Medical QA pipeline (import + RAGSearch() + first answer),
+  with and without fast start (refresh_index=False and a background model preload)
+
+    python startup_benchmark.py --stub
+    python startup_benchmark.py --runs 5 --query "What is sleep apnea?" --output startup.json
+
+--stub uses the offline LLM backend, so only local work is timed. The index must already
+exist (build it once with the app or evaluate.py).
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+MODULES = ["src.data_loader", "src.embedding", "src.vectorstore", "src.search", "src.compliance",
+           "streamlit_app", "task2_app"]
+
+INTERPRETER_STARTUP = {"site", "sitecustomize", "usercustomize", "encodings", "codecs", "io", "abc", "os", "stat",
+                       "posixpath", "ntpath", "genericpath", "_collections_abc", "_sitebuiltins", "_distutils_hack"}
+
+CHILD_FIRST_ANSWER = """
+import json, sys, time
+start = time.perf_counter()
+from src.search import RAGSearch
+from src.model_registry import preload_embedding_model, model_stats
+imported = time.perf_counter()
+fast = sys.argv[1] == "fast"
+if fast:
+    preload_embedding_model()
+rag = RAGSearch(refresh_index=not fast)
+initialized = time.perf_counter()
+result = rag.answer(sys.argv[2], top_k=5)
+answered = time.perf_counter()
+print("RESULT " + json.dumps({
+    "import_s": imported - start,
+    "init_s": initialized - imported,
+    "first_answer_s": answered - initialized,
+    "total_s": answered - start,
+    "stages": dict(result.trace.stages),
+    "model_load_s": sum(s["load_seconds"] for s in model_stats().values()),
+}))
+"""
+
+def _run(args, env=None) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True, env=env, check=True)
+
+def import_time(module: str) -> float:
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    return float(_run(["-c", code]).stdout.strip().splitlines()[-1])
+
+def slowest_imports(module: str, top: int = 10):
+    """(cumulative seconds, package) for the slowest packages imported by module (itself excluded)."""
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        root = name.split(".")[0]
+        # Interpreter startup imports also show up in the trace; only count the module's own
+        if cumulative.isdigit() and root != module.split(".")[0] and root not in INTERPRETER_STARTUP:
+            packages[root] = max(packages.get(root, 0.0), int(cumulative) / 1e6)
+    return sorted(((s, n) for n, s in packages.items()), reverse=True)[:top]
+
+def first_answer(mode: str, query: str, env) -> dict:
+    out = _run(["-c", CHILD_FIRST_ANSWER, mode, query], env=env).stdout
+    return json.loads(next(line for line in out.splitlines() if line.startswith("RESULT "))[len("RESULT "):])
+
+def median_of(runs, key):
+    return round(statistics.median(r[key] for r in runs), 3)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-answer benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement (median reported)")
+    parser.add_argument("--query", default="What are the symptoms of allergic rhinitis?")
+    parser.add_argument("--stub", action="store_true", help="Use the offline stub LLM (LLM_BACKEND=stub)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.stub:
+        env["LLM_BACKEND"] = "stub"
+    report = {"imports": {}, "slowest_imports": {}, "first_answer": {}}
+
+    print("[INFO] Import time per module (fresh process, median of runs):")
+    for module in MODULES:
+        try:
+            seconds = statistics.median(import_time(module) for _ in range(args.runs))
+        except subprocess.CalledProcessError as e:
+            print(f"[WARNING] Could not import {module}: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        report["imports"][module] = round(seconds, 3)
+        print(f"  {module:<20} {seconds * 1000:8.1f} ms")
+
+    for module in ("src.search", "src.compliance"):
+        try:
+            report["slowest_imports"][module] = [(round(s, 3), n) for s, n in slowest_imports(module)]
+        except subprocess.CalledProcessError:
+            continue
+        print(f"[INFO] Slowest imports under {module}: "
+              + ", ".join(f"{n} {s * 1000:.0f} ms" for s, n in report["slowest_imports"][module]))
+
+    for mode in ("full", "fast"):
+        try:
+            runs = [first_answer(mode, args.query, env) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"[ERROR] First-answer run ({mode}) failed:\n{e.stderr}")
+            continue
+        summary = {key: median_of(runs, key) for key in ("import_s", "init_s", "first_answer_s", "total_s", "model_load_s")}
+        summary["stages"] = runs[-1]["stages"]
+        report["first_answer"][mode] = summary
+        print(f"[INFO] Time to first answer ({mode} start): import {summary['import_s']:.2f}s + init {summary['init_s']:.2f}s "
+              f"+ answer {summary['first_answer_s']:.2f}s = {summary['total_s']:.2f}s "
+              f"(embedding model load {summary['model_load_s']:.2f}s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Wrote {args.output}")
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from src.answer_cache import AnswerCache
+from src.compliance import ComplianceChecker
+from src.llm import StubBackend
+from src.search import RAGSearch
+
+RESULTS = [{"index": 0, "distance": 0.1, "metadata": {"source": "policy.pdf", "page": 1, "text": "Data is encrypted at rest."}}]
+
+class FakeVectorStore:
+    index_version = "test"
+
+    def query(self, query, top_k=5, filter=None):
+        return RESULTS
+
+    def embed_queries(self, queries):
+        return np.ones((len(queries), 4), dtype='float32')
+
+class FailingBackend(StubBackend):
+    """Streams one token, then fails like a dropped LLM connection."""
+
+    def generate(self, prompt, timeout=None):
+        raise ConnectionError("LLM unavailable")
+
+    def stream(self, prompt, timeout=None):
+        yield "Partial"
+        raise ConnectionError("LLM unavailable")
+
+def make(cls, llm):
+    # Skip __init__: no index, data directory or rules file is needed here
+    pipeline = cls.__new__(cls)
+    pipeline.llm = llm
+    pipeline.model_name = llm.model_name
+    pipeline.vectorstore = FakeVectorStore()
+    pipeline.answer_cache = AnswerCache()
+    pipeline.context_token_budget = None
+    return pipeline
+
+def ask(pipeline, stream):
+    if isinstance(pipeline, RAGSearch):
+        return pipeline.answer("Is data encrypted?", stream=stream)
+    return pipeline.answer_question("Is data encrypted?", stream=stream)
+
+def assert_finished(result):
+    assert {"retrieval", "time_to_first_token", "total"} <= set(result.timings)
+    assert result.trace.total is not None
+
+def test_policy_qa_stream_error_is_raised_with_finished_timings():
+    result = ask(make(ComplianceChecker, FailingBackend()), stream=True)
+    tokens = []
+    with pytest.raises(ConnectionError):
+        for token in result.stream():
+            tokens.append(token)
+    assert tokens == ["Partial"]
+    assert_finished(result)
+
+def test_policy_qa_generate_error_is_raised_with_finished_timings():
+    checker = make(ComplianceChecker, FailingBackend())
+    with pytest.raises(ConnectionError):
+        ask(checker, stream=False)
+    assert checker.last_trace.total is not None
+
+def test_rag_stream_error_becomes_the_answer():
+    result = ask(make(RAGSearch, FailingBackend()), stream=True)
+    text = "".join(result.stream())
+    assert text.startswith("Partial") and "Error generating response: LLM unavailable" in text
+    assert_finished(result)
+
+@pytest.mark.parametrize("cls", [RAGSearch, ComplianceChecker])
+def test_streamed_answer_is_cached_for_both_pipelines(cls):
+    pipeline = make(cls, StubBackend(response="Yes, it is encrypted."))
+    first = ask(pipeline, stream=True)
+    assert "".join(first.stream()) == "Yes, it is encrypted."
+    assert_finished(first)
+    second = ask(pipeline, stream=False)
+    assert second.cached and second.answer == "Yes, it is encrypted."
+    assert second.context_ids == [0]
@@ -0,0 +1,76 @@
+import asyncio
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from src import api
+
+class FakeChecker:
+    def __init__(self):
+        self.calls = []
+
+    def run_audit(self, **options):
+        self.calls.append(options)
+        return pd.DataFrame([{"Rule ID": 1, "Status": "Compliant"}])
+
+class FakeVectorStore:
+    def query(self, query, top_k=5, filter=None):
+        return []
+
+class FakeRAG:
+    vectorstore = FakeVectorStore()
+
+def request(method, path, **kwargs):
+    """Send one request to an app with fake pipelines; returns (status, json body, checker)."""
+    checker = FakeChecker()
+
+    async def load(app, rag_kwargs, checker_kwargs, batching):
+        app[api.STATE_KEY].update({"rag": FakeRAG(), "checker": checker, "ready": True})
+
+    async def run():
+        original = api._load_pipelines
+        api._load_pipelines = load
+        try:
+            async with TestClient(TestServer(api.create_app({}, {}, preload_model=None))) as client:
+                await asyncio.sleep(0)
+                response = await client.request(method, path, **kwargs)
+                return response.status, await response.json()
+        finally:
+            api._load_pipelines = original
+    status, body = asyncio.run(run())
+    return status, body, checker
+
+@pytest.mark.parametrize("top_k", [True, False, 0, 51, "5", 2.5])
+def test_search_rejects_bad_top_k(top_k):
+    status, body, _ = request("POST", "/search", json={"query": "chest pain", "top_k": top_k})
+    assert status == 400 and "top_k" in body["error"]
+
+def test_search_accepts_valid_query():
+    status, body, _ = request("POST", "/search", json={"query": "chest pain", "top_k": 3})
+    assert status == 200 and body["chunks"] == []
+
+@pytest.mark.parametrize("payload", [
+    [], "text",
+    {"max_workers": "4"}, {"max_workers": 0}, {"max_workers": True}, {"max_workers": 1000},
+    {"max_retries": -1}, {"max_retries": 1.5},
+    {"requests_per_second": -2}, {"requests_per_second": "fast"}, {"timeout": 0}, {"timeout": False},
+])
+def test_audit_rejects_bad_body(payload):
+    status, body, checker = request("POST", "/audit", json=payload)
+    assert status == 400 and body["error"]
+    assert checker.calls == []
+
+@pytest.mark.parametrize("data", ["null", "{not json"])
+def test_audit_rejects_non_object_json(data):
+    status, body, checker = request("POST", "/audit", data=data, headers={"Content-Type": "application/json"})
+    assert status == 400 and body["error"]
+    assert checker.calls == []
+
+def test_audit_passes_valid_options():
+    options = {"max_workers": 2, "max_retries": 0, "requests_per_second": 1.5, "timeout": None}
+    status, body, checker = request("POST", "/audit", json=options)
+    assert status == 200 and body["results"][0]["Status"] == "Compliant"
+    assert checker.calls == [options]
+
+def test_audit_without_body_uses_defaults():
+    status, _, checker = request("POST", "/audit")
+    assert status == 200 and checker.calls == [{}]
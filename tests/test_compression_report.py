@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from compression_report import load_store_vectors
+from src.vectorstore import FaissVectorStore
+
+@pytest.mark.parametrize("index_type, index_params", [
+    ("flat", {}),
+    ("flat", {"pca_dim": 16, "train_size": 300}),
+    ("ivf_flat", {"nlist": 4, "train_size": 300}),
+    ("hnsw", {}),
+])
+def test_load_store_vectors_after_removals(tmp_path, index_type, index_params):
+    store = FaissVectorStore(str(tmp_path / "store"), index_type=index_type, index_params=index_params,
+                             query_cache_path=None, chunk_cache_dir=None)
+    vectors = np.random.default_rng(0).standard_normal((300, 32)).astype('float32')
+    ids = store.add_embeddings(vectors, [{"text": f"chunk {i}"} for i in range(300)])
+    removed = ids[:100:3]
+    store.remove_ids(removed.tolist())
+    store.save()
+
+    loaded = load_store_vectors(store.persist_dir)
+    kept = np.sort(np.setdiff1d(ids, removed))
+    assert loaded.shape == (len(kept), 32)
+    if index_params.get("pca_dim"):
+        # PCA to 16 of 32 dimensions: each vector comes back as its projection, closest to its original
+        nearest = np.argmin(((loaded[:, None, :] - vectors[None, kept, :]) ** 2).sum(-1), axis=1)
+        assert (nearest == np.arange(len(kept))).mean() > 0.9
+    else:
+        # The same vectors that were kept, in any order
+        expected = vectors[kept]
+        np.testing.assert_allclose(loaded[np.lexsort(loaded.T[::-1])], expected[np.lexsort(expected.T[::-1])],
+                                   rtol=1e-5, atol=1e-5)
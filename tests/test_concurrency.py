@@ -0,0 +1,30 @@
+import time
+import pytest
+from src.concurrency import retry_with_backoff, run_bounded
+
+def test_run_bounded_keeps_input_order():
+    assert run_bounded(lambda x: x * 2, [3, 1, 2], max_workers=3, timeout=5.0) == [6, 2, 4]
+
+def test_run_bounded_replaces_hung_items_and_frees_their_slot():
+    def work(x):
+        if x == 0:
+            time.sleep(3.0)
+        return x
+    start = time.perf_counter()
+    results = run_bounded(work, [0, 1, 2], max_workers=1, timeout=0.2, on_timeout=lambda x: "timeout")
+    assert results == ["timeout", 1, 2]
+    assert time.perf_counter() - start < 1.5
+
+def test_run_bounded_raises_without_on_timeout():
+    with pytest.raises(TimeoutError):
+        run_bounded(lambda x: time.sleep(1.0), [0], timeout=0.1)
+
+def test_retry_stops_at_deadline():
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        retry_with_backoff(fail, max_retries=5, base_delay=1.0, deadline=time.monotonic() + 0.2)
+    assert len(calls) == 1
@@ -0,0 +1,29 @@
+from src.context import count_tokens, pack_context
+
+SHARED = "the overlapping tail of the first chunk that the second chunk repeats at its start. "
+FIRST = "Background notes on the procedure and the general admission policy for new patients. " * 3 + SHARED
+SECOND = SHARED + "Dosage: take the medication twice daily with food and report any allergic reaction."
+
+def result(index, text):
+    return {"index": index, "metadata": {"text": text, "source": "doc.pdf"}}
+
+def test_over_budget_merged_passage_keeps_its_best_chunk():
+    # The best match (id 2) comes second in the merged passage, so cutting the passage's
+    # beginning would keep only the lower-ranked chunk
+    results = [result(2, SECOND), result(1, FIRST)]
+    context, ids, stats = pack_context(results, token_budget=count_tokens(SECOND) + 2)
+    assert "Dosage: take the medication twice daily" in context
+    assert ids == [2]
+    assert stats["dropped_for_budget"] == 1
+
+def test_truncated_context_only_reports_the_truncated_chunk():
+    results = [result(2, SECOND), result(1, FIRST)]
+    context, ids, _ = pack_context(results, token_budget=5)
+    assert SECOND.startswith(context)
+    assert ids == [2]
+
+def test_merged_passage_within_budget_reports_all_ids():
+    context, ids, stats = pack_context([result(2, SECOND), result(1, FIRST)], token_budget=None)
+    assert stats["merged"] == 1
+    assert context.count(SHARED.strip()) == 1
+    assert sorted(ids) == [1, 2]
@@ -0,0 +1,52 @@
+import numpy as np
+from src.sharding import ShardedVectorStore
+
+class FakeShard:
+    """An in-memory shard answering search_batch() and info() like LocalShard/RemoteShard."""
+
+    def __init__(self, name, shard, hits, version="v1"):
+        self.name = name
+        self.shard = shard
+        self.hits = hits
+        self.version = version
+        self.fail = False
+
+    def info(self):
+        if self.fail:
+            raise ConnectionError("shard down")
+        return {"shard": [self.shard, 2], "ntotal": len(self.hits), "index_version": self.version,
+                "embedding_model": "all-MiniLM-L6-v2"}
+
+    def search_batch(self, vectors, top_k, filter=None):
+        return [sorted(self.hits, key=lambda h: h["distance"])[:top_k] for _ in range(len(vectors))]
+
+    def close(self):
+        pass
+
+def make_store():
+    shards = [FakeShard("s0", 0, [{"index": 0, "distance": 0.5, "metadata": {"text": "a"}},
+                                  {"index": 2, "distance": 2.0, "metadata": {"text": "c"}}]),
+              FakeShard("s1", 1, [{"index": 1, "distance": 1.0, "metadata": {"text": "b"}}])]
+    store = ShardedVectorStore(shards, query_cache_path=None)
+    store.load()
+    return store, shards
+
+def test_query_merges_shards_by_distance():
+    store, _ = make_store()
+    # Served from the query cache, so no embedding model is needed
+    store.query_cache.put_many(["chest pain"], np.ones((1, 4), dtype='float32'))
+    assert [hit["index"] for hit in store.query("chest pain", top_k=2)] == [0, 1]
+    assert [[hit["index"] for hit in hits] for hits in store.query_batch(["chest pain"], top_k=3)] == [[0, 1, 2]]
+    store.close()
+
+def test_index_version_follows_rebuilt_shards():
+    store, shards = make_store()
+    before = store.index_version
+    assert store.index_version == before
+    shards[1].version = "v2"
+    after = store.index_version
+    assert after != before
+    # A shard that stops answering keeps its last known version
+    shards[1].fail = True
+    assert store.index_version == after
+    store.close()
@@ -0,0 +1,140 @@
+import hashlib
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src import data_loader, vectorstore
+from src.vectorstore import FaissVectorStore
+
+def make_store(path, index_type="flat", index_params=None, n=200, dim=32):
+    store = FaissVectorStore(str(path), index_type=index_type, index_params=index_params,
+                             query_cache_path=None, chunk_cache_dir=None)
+    vectors = np.random.default_rng(0).standard_normal((n, dim)).astype('float32')
+    store.add_embeddings(vectors, [{"text": f"chunk {i}", "source": "a.txt" if i % 2 else "b.txt"} for i in range(n)])
+    store.save()
+    return store, vectors
+
+@pytest.mark.parametrize("index_params", [{"pca_dim": 8, "train_size": 200}, {"storage": "int8", "train_size": 200}])
+def test_filtered_search_scores_the_same_on_both_paths(tmp_path, monkeypatch, index_params):
+    store, vectors = make_store(tmp_path / "store", index_params=index_params)
+    queries = vectors[[1, 3, 4]]
+    results = {}
+    for limit in (vectorstore.FILTER_BRUTE_FORCE_MAX, 0):
+        monkeypatch.setattr(vectorstore, "FILTER_BRUTE_FORCE_MAX", limit)
+        results[limit] = store._filtered_search(queries, 5, {"source": "a.txt"})
+    (d_small, i_small), (d_large, i_large) = results.values()
+    np.testing.assert_array_equal(i_small, i_large)
+    np.testing.assert_allclose(d_small, d_large, rtol=1e-5, atol=1e-5)
+    assert set(i_small.ravel()) <= set(range(1, 200, 2))
+
+def test_filtered_search_exact_on_flat_index(tmp_path, monkeypatch):
+    store, vectors = make_store(tmp_path / "store")
+    D, I = store._filtered_search(vectors[[3]], 3, {"source": "a.txt"})
+    assert I[0, 0] == 3 and D[0, 0] == pytest.approx(0.0, abs=1e-4)
+    monkeypatch.setattr(vectorstore, "FILTER_BRUTE_FORCE_MAX", 0)
+    D2, I2 = store._filtered_search(vectors[[3]], 3, {"source": "a.txt"})
+    np.testing.assert_array_equal(I, I2)
+    np.testing.assert_allclose(D, D2, rtol=1e-5, atol=1e-4)
+
+
+class FakePipeline:
+    """Splits documents on blank lines and embeds each chunk from a hash of its text."""
+    cache = None
+
+    def iter_chunks(self, documents):
+        for doc in documents:
+            for part in doc.page_content.split("\n\n"):
+                yield Document(page_content=part, metadata=dict(doc.metadata))
+
+    def embed_batch(self, chunks):
+        return np.stack([np.random.default_rng(int(hashlib.md5(c.page_content.encode()).hexdigest()[:8], 16))
+                         .standard_normal(8).astype('float32') for c in chunks])
+
+    def close(self):
+        pass
+
+def load_text(path):
+    # Module level so the loader pool can pickle it
+    return [Document(page_content=open(path).read(), metadata={})]
+
+@pytest.fixture
+def refresh_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "iter_file", lambda path: iter(load_text(path)))
+    store = FaissVectorStore(str(tmp_path / "store"), batch_size=2, query_cache_path=None, chunk_cache_dir=None,
+                             load_workers=1)
+    monkeypatch.setattr(store, "_embedding_pipeline", FakePipeline)
+    return store
+
+def write(path, paragraphs):
+    path.write_text("\n\n".join(paragraphs))
+    return str(path)
+
+def index_ids(store):
+    return set(faiss.vector_to_array(store.index.id_map).tolist())
+
+def manifest_ids(store):
+    return {cid for entry in store.manifest["files"].values() for _, cid in entry["chunks"]}
+
+def assert_consistent(store):
+    assert index_ids(store) == manifest_ids(store)
+    assert set(store.chunks.all_ids()) == index_ids(store)
+    assert store.manifest["next_id"] > max(index_ids(store))
+
+def test_refresh_adds_changes_and_deletes_files(refresh_store, tmp_path):
+    a = write(tmp_path / "a.txt", ["alpha one", "alpha two", "alpha three"])
+    b = write(tmp_path / "b.txt", ["beta one", "beta two", "beta three"])
+    stats = refresh_store.refresh([a, b])
+    assert (stats["added"], stats["changed_files"]) == (6, 2)
+    assert refresh_store.manifest["next_id"] == 6
+    assert_consistent(refresh_store)
+
+    # One paragraph replaced: only it is embedded, and only its old chunk is removed
+    write(tmp_path / "a.txt", ["alpha one", "alpha 2", "alpha three"])
+    stats = refresh_store.refresh([a, b])
+    assert (stats["added"], stats["removed"], stats["changed_files"], stats["unchanged_files"]) == (1, 1, 1, 1)
+    assert refresh_store.manifest["next_id"] == 7
+    assert_consistent(refresh_store)
+
+    stats = refresh_store.refresh([a])
+    assert (stats["removed"], stats["deleted_files"]) == (3, 1)
+    assert list(refresh_store.manifest["files"]) == [a]
+    assert len(index_ids(refresh_store)) == 3
+    assert_consistent(refresh_store)
+
+def test_refresh_rolls_back_a_failed_batch_and_resumes(refresh_store, tmp_path, monkeypatch):
+    a = write(tmp_path / "a.txt", ["alpha one", "alpha two"])
+    refresh_store.refresh([a])
+    c = write(tmp_path / "c.txt", ["c1", "c2", "c3", "c4", "c5 boom", "c6"])
+    put_many = refresh_store.chunks.put_many
+
+    def failing_put_many(ids, metadatas):
+        # Fails after the batch's vectors are already in the index
+        if any("boom" in m["text"] for m in metadatas):
+            raise RuntimeError("disk full")
+        return put_many(ids, metadatas)
+
+    monkeypatch.setattr(refresh_store.chunks, "put_many", failing_put_many)
+    stats = refresh_store.refresh([a, c])
+    # Two batches landed before the third failed and was rolled back
+    assert (stats["added"], stats["changed_files"]) == (4, 0)
+    assert refresh_store.manifest["files"][c]["partial"] is True
+    assert len(index_ids(refresh_store)) == 6
+    assert refresh_store.manifest["next_id"] == 2 + 6
+    assert_consistent(refresh_store)
+
+    monkeypatch.setattr(refresh_store.chunks, "put_many", put_many)
+    stats = refresh_store.refresh([a, c])
+    assert (stats["added"], stats["changed_files"], stats["unchanged_files"]) == (2, 1, 1)
+    assert "partial" not in refresh_store.manifest["files"][c]
+    assert len(index_ids(refresh_store)) == 8
+    assert_consistent(refresh_store)
+
+def test_refresh_parses_changed_files_in_a_pool(refresh_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "load_file", load_text)
+    monkeypatch.setattr(data_loader, "iter_file", lambda path: pytest.fail(f"{path} was not prefetched"))
+    refresh_store.load_workers = 2
+    paths = [write(tmp_path / f"f{i}.txt", [f"file {i} part {j}" for j in range(3)]) for i in range(4)]
+    stats = refresh_store.refresh(paths)
+    assert (stats["added"], stats["changed_files"]) == (12, 4)
+    assert sorted(refresh_store.manifest["files"]) == sorted(paths)
+    assert_consistent(refresh_store)